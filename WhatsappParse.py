@@ -1,7 +1,4 @@
-import re
-
-USERMESSAGE_FORMAT = '\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - (.*?)\:'
-SYSMESSAGE_FORMAT = '\d{2}/\d{2}/\d{4}, \d{2}:\d{2} - ([^:]*?)$'
+import whatsapp_parser
 
 
 def parse_line(line):
@@ -28,6 +25,28 @@ def parse_line(line):
     return time, user, message
 
 
+def parse_all(text):
+    """
+    Parse a chunk of conversation text to get both kinds of messages in a
+    single pass (see whatsapp_parser.split_messages).
+
+    Args:
+        text (string): Text to parse in the format of a Whatsapp archived chat.
+    Returns:
+        tuple: (messages, system messages), lists of (date, user, message)
+        tuples. System messages have the user 'system'.
+    """
+    messages = list()
+    system_messages = list()
+    for time, user, message in whatsapp_parser.split_messages(text):
+        if user:
+            messages.append((time, user.strip(), message.strip()))
+        else:
+            system_messages.append((time, 'system', message.strip()))
+
+    return messages, system_messages
+
+
 def parse_convo(text):
     """
     Parse a chunk of conversation text to get messages.
@@ -37,15 +56,7 @@ def parse_convo(text):
     Returns:
         list: A list of messages represented in tuples.
     """
-    text = text.strip()
-
-    messages = list()
-    for line in text.split('\n'):
-        # Skip system messages
-        if re.match(USERMESSAGE_FORMAT, line):
-            messages.append(parse_line(line))
-
-    return messages
+    return parse_all(text)[0]
     
 def parse_sysmsg(text):
     """
@@ -56,14 +67,6 @@ def parse_sysmsg(text):
     Returns:
         list: A list of system messages represented in tuples.
     """
-    text = text.strip()
-
-    messages = list()
-    for line in text.split('\n'):
-        # Find system messages
-        if re.match(SYSMESSAGE_FORMAT, line):
-            messages.append(parse_line(line))
-
-    return messages
+    return parse_all(text)[1]
   
 
@@ -0,0 +1,98 @@
+import sys
+import random
+
+from datetime import datetime, timedelta
+
+ENGLISH = [
+	"the", "you", "what", "ok", "yes", "no", "lol", "wtf", "why", "now", "today",
+	"tomorrow", "good", "night", "morning", "who", "coming", "where", "see", "nice",
+]
+HEBREW = [
+	"מה", "לא", "כן", "שלום",
+	"אני", "אתה", "היום",
+	"מחר", "בסדר", "תודה",
+	"יאללה", "מתי", "איפה",
+	"קורה", "טוב", "למה",
+]
+# "ח" is H, see whatsapp_parser.Text.H
+H = "ח"
+PUNCTUATION = ["", "", "", "?", "!", ".", "..."]
+
+MEDIA = "<Media omitted>"
+SYSTEM = [
+	"%s added %s",
+	"%s left",
+	"%s removed %s",
+	"%s changed the group description",
+]
+
+def short_date(date):
+	# "m/d/yy, HH:MM", the format whatsapp_parser reads
+	return "%d/%d/%02d, %02d:%02d" % (date.month, date.day, date.year % 100, date.hour, date.minute)
+
+def long_date(date):
+	# "dd/mm/yyyy, HH:MM", the format WhatsappParse reads
+	return "%02d/%02d/%04d, %02d:%02d" % (date.day, date.month, date.year, date.hour, date.minute)
+
+def generate(
+		messages,
+		users=10,
+		hebrew=0.5,
+		media=0.1,
+		system=0.02,
+		laughter=0.1,
+		multiline=0.02,
+		seed=0,
+		start=datetime(2016, 1, 1),
+		long_dates=False):
+	"""
+	yields the lines of a synthetic chat export, message by message
+		messages  - amount of messages
+		users     - amount of users
+		hebrew    - chance of every word to be hebrew rather than english
+		media     - chance of a message to be "<Media omitted>"
+		system    - chance of a message to be a system message
+		laughter  - chance of a text message to have a run of H in it
+		multiline - chance of a text message to have a second line
+	the same arguments (and seed) always give the same chat
+	"""
+	rng = random.Random(seed)
+	names = ["User %d" % i for i in range(users)]
+	date_format = long_date if long_dates else short_date
+
+	date = start
+	for i in range(messages):
+		date += timedelta(minutes=int(rng.expovariate(1 / 10.)))
+		header = date_format(date) + " - "
+
+		kind = rng.random()
+		if kind < system:
+			template = rng.choice(SYSTEM)
+			yield header + template % tuple(rng.sample(names, template.count("%s"))) + "\n"
+			continue
+
+		user = rng.choice(names)
+		if kind < system + media:
+			yield header + user + ": " + MEDIA + "\n"
+			continue
+
+		words = [
+			rng.choice(HEBREW) if rng.random() < hebrew else rng.choice(ENGLISH)
+			for j in range(1 + int(rng.expovariate(1 / 5.)))
+		]
+		if rng.random() < laughter:
+			words.insert(rng.randint(0, len(words)), H * rng.randint(2, 12))
+		text = " ".join(words) + rng.choice(PUNCTUATION)
+		if rng.random() < multiline:
+			text += "\n" + " ".join(rng.choice(ENGLISH) for j in range(3))
+
+		yield header + user + ": " + text + "\n"
+
+def write(file_name, messages, **kwargs):
+	# writes generate(messages, **kwargs) into file_name
+	with open(file_name, 'w', encoding="utf8") as f:
+		f.writelines(generate(messages, **kwargs))
+
+if __name__ == '__main__':
+	# generate.py [messages] [file name]
+	write(sys.argv[2] if len(sys.argv) > 2 else 'w', int(sys.argv[1]))
@@ -0,0 +1,128 @@
+"""
+times and memory-profiles the parsing and analysis steps on synthetic chats
+(see bench.generate) of growing sizes, one JSON line per step and size
+
+	python -m bench.run --sizes 10000 100000 --output bench_output.txt
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import WhatsappParse
+import whatsapp_parser
+import whatsapp_time_statistics
+
+from bench import generate
+
+SIZES = [10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+def measure(function, memory=True):
+	"""
+	runs function and returns (its result, {seconds, cpu_seconds, peak_bytes})
+	the peak memory is measured with tracemalloc in a second run, since
+	tracing slows the first one down
+	"""
+	start, cpu_start = time.perf_counter(), time.process_time()
+	result = function()
+	stats = {
+		"seconds"     : time.perf_counter() - start,
+		"cpu_seconds" : time.process_time() - cpu_start,
+	}
+
+	if memory:
+		tracemalloc.start()
+		function()
+		stats["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+		tracemalloc.stop()
+
+	return result, stats
+
+def benchmarks(file_name, long_file_name):
+	# yields (name, function) of every benchmark, each step may use the results of the previous ones
+	state = {}
+
+	def parse_lines():
+		state["data"] = whatsapp_parser.Data(file_name)
+		state["data"].read_data()
+		return state["data"].parse_lines()
+
+	def init_all():
+		state["analyzed"] = whatsapp_parser.Data(file_name)
+		state["analyzed"].init_all()
+
+	def get_most_common_words():
+		# the matrix is dropped first, measure runs every step twice
+		state["initialized"].__dict__.pop("document_terms", None)
+		return state["initialized"].get_most_common_words()
+
+	def get_full_dates():
+		state["full_dates"] = whatsapp_time_statistics.get_full_dates(state["data"].data)
+
+	def get_histograms():
+		lines = state["analyzed"].lines
+		return whatsapp_time_statistics.get_histograms(lines.days, lines.minutes, lines.user_ids)
+
+	def parse_convo():
+		with open(long_file_name, encoding="utf8") as f:
+			return WhatsappParse.parse_convo(f.read())
+
+	yield "Data.parse_lines", parse_lines
+	yield "Data.init_all", init_all
+	# a Data after init() only (outside of the measured steps), init_all has already built the words of "analyzed"
+	state["initialized"] = whatsapp_parser.Data(file_name)
+	state["initialized"].init()
+	yield "Data.get_most_common_words", get_most_common_words
+	yield "whatsapp_time_statistics.get_full_dates", get_full_dates
+	yield "whatsapp_time_statistics.get_days_and_minutes", lambda: whatsapp_time_statistics.get_days_and_minutes(state["full_dates"])
+	yield "whatsapp_time_statistics.get_histograms", get_histograms
+	yield "WhatsappParse.parse_convo", parse_convo
+
+def run(sizes=SIZES, memory=True, **kwargs):
+	# yields a result dict per benchmark per size, kwargs go to generate.generate
+	directory = tempfile.mkdtemp()
+	for size in sizes:
+		file_name = os.path.join(directory, "chat_%d.txt" % size)
+		long_file_name = os.path.join(directory, "chat_%d_long.txt" % size)
+		generate.write(file_name, size, **kwargs)
+		generate.write(long_file_name, size, long_dates=True, **kwargs)
+
+		for name, function in benchmarks(file_name, long_file_name):
+			stats = measure(function, memory)[1]
+			stats.update({
+				"benchmark" : name,
+				"messages"  : size,
+				"bytes"     : os.path.getsize(file_name),
+				"python"    : platform.python_version(),
+			})
+			yield stats
+
+		os.remove(file_name)
+		os.remove(long_file_name)
+	os.rmdir(directory)
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("--sizes", type=int, nargs="+", default=SIZES)
+	parser.add_argument("--users", type=int, default=10)
+	parser.add_argument("--hebrew", type=float, default=0.5)
+	parser.add_argument("--media", type=float, default=0.1)
+	parser.add_argument("--system", type=float, default=0.02)
+	parser.add_argument("--laughter", type=float, default=0.1)
+	parser.add_argument("--seed", type=int, default=0)
+	parser.add_argument("--no-memory", dest="memory", action="store_false")
+	parser.add_argument("--output", help="file to append the JSON lines to, stdout by default")
+	args = vars(parser.parse_args())
+
+	output = args.pop("output")
+	output = open(output, 'a') if output else sys.stdout
+	for stats in run(**args):
+		output.write(json.dumps(stats) + "\n")
+		output.flush()
@@ -1,85 +1,103 @@
 #!/usr/bin/python3
 
+# builds description.csv and images.atlas out of
+# http://unicode.org/emoji/charts/full-emoji-list.html
+#	pasrser.py [html file] [output directory]
+
+import os
 import re
-from xml.etree import ElementTree as ET
+import sys
 import base64
 
-data = open("full-emoji-list.html", 'rb').read()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from utils.emoji import AtlasWriter
+
+# the page is tens of MB of inline base64 images, it is read in blocks
+CHUNK_SIZE = 1 << 20
 
 start = b"<table"
 end = b"</table>"
 row_start = b"<tr>"
 row_end = b"</tr>"
 
-a = data[data.find(start) : data.find(end) + len(end)]
-a = a[19:-len(end)]
-
-rows = []
-while b"<tr>" in a:
-	rows.append(a[a.find(row_start) : a.find(row_end) + len(row_end)])
-	a = a[a.find(row_end) + len(row_end) : ]
-
-# get headers
-headers_raw = rows[0]
-headers = re.findall("<.*'>(.*?)</a></th>", headers_raw.decode("utf8"))
-headers[0] = "Id"
-headers[5] = "Google"
-
-headers = [
-	headers[1], # Unicode code
-	headers[4], # apple image
-	headers[15] # description
-]
-
-parsed_rows = map(
-	lambda x: re.findall(b"<td.*?>(.*?)</td>", x),
-	rows[1:]
-)
-
-# is it really a row or just headers
-parsed_rows = filter(
-	lambda x: x,
-	parsed_rows
-)
-
-raw_data = [
-	[
-		i[1], # Unicode code
-		i[4], # apple image
-		i[15] # description
-	]
-	for i in parsed_rows
-]
-
-# only images that exist for apple. not '-'
-raw_data = filter(
-	lambda x: x[1] != b'\xe2\x80\x94',
-	raw_data
-)
-
-data = [
-	[
-		re.findall(b"name='(.*?)'", i[0])[0],
-		re.findall(b"src='data:image/png;base64,(.*?)'>", i[1])[0],
-		i[2]
-	]
-	for i in raw_data
-]
-
-data = [
-	[
-		i[0].decode("utf8"),
-		base64.decodebytes(i[1]),
-		i[2].decode("utf8")
-	]
-	for i in data
-]
-
-csv = open("/home/me/Projects/Whatsapp/emoji/description.csv", 'w')
-
-for i in data:
-	csv.write("%s,%s\n" % (i[0], i[2]))
-	# add image
-	open("/home/me/Projects/Whatsapp/emoji/images/%s.png" % i[0], 'wb').write(i[1])
-
-csv.close()
\ No newline at end of file
+# the columns of a row that are kept
+CODE = 1
+APPLE = 4
+DESCRIPTION = 15
+
+# an apple column without an image
+NO_IMAGE = b'\xe2\x80\x94'
+
+def iter_rows(f, chunk_size=CHUNK_SIZE):
+	"""
+	yields the "<tr>...</tr>" rows of the first table in the file, scanning it
+	once. only the part of the current block after the last complete row is
+	kept between blocks, so nothing is copied more than twice
+	"""
+	buffer = b""
+	in_table = False
+	for block in iter(lambda: f.read(chunk_size), b""):
+		buffer += block
+		position = 0
+
+		if not in_table:
+			position = buffer.find(start)
+			if position == -1:
+				# keep what may be the beginning of start
+				buffer = buffer[-len(start):]
+				continue
+			in_table = True
+
+		# only looked up again when the buffer changes, -1 when it's in a later block
+		table_end = buffer.find(end, position)
+		while True:
+			first = buffer.find(row_start, position)
+			if table_end != -1 and (first == -1 or table_end < first):
+				return
+			if first == -1:
+				break
+			last = buffer.find(row_end, first)
+			if last == -1:
+				break
+			position = last + len(row_end)
+			yield buffer[first:position]
+
+		buffer = buffer[position:]
+
+def parse_row(row):
+	# (code, png data, description) of a row, None for headers and rows without an apple image
+	cells = re.findall(b"<td.*?>(.*?)</td>", row)
+	if not cells or cells[APPLE] == NO_IMAGE:
+		return None
+
+	return (
+		re.findall(b"name='(.*?)'", cells[CODE])[0].decode("utf8"),
+		base64.decodebytes(re.findall(b"src='data:image/png;base64,(.*?)'>", cells[APPLE])[0]),
+		cells[DESCRIPTION].decode("utf8")
+	)
+
+def extract(html_file="full-emoji-list.html", output_directory=os.path.dirname(os.path.abspath(__file__))):
+	"""
+	writes [output_directory]/description.csv and [output_directory]/images.atlas
+	(see utils.emoji) while reading html_file, returns the amount of emojis
+	"""
+	amount = 0
+	with open(html_file, 'rb') as f, \
+		open(os.path.join(output_directory, "description.csv"), 'w', encoding="utf8") as csv, \
+		AtlasWriter(os.path.join(output_directory, "images.atlas")) as atlas:
+
+		rows = iter_rows(f)
+		# the first row is the headers
+		next(rows, None)
+		for row in rows:
+			emoji = parse_row(row)
+			if emoji:
+				code, image, description = emoji
+				csv.write("%s,%s\n" % (code, description))
+				atlas.add(code, image)
+				amount += 1
+
+	return amount
+
+if __name__ == '__main__':
+	print("%d emojis" % extract(*sys.argv[1:3]))
@@ -0,0 +1,82 @@
+import os
+import sys
+import importlib.util
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from utils.emoji import EmojiAtlas, EmojiMatcher, code_to_text, get_matcher, read_descriptions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURE = os.path.join(ROOT, "tests", "fixtures", "full-emoji-list.html")
+
+# emoji/pasrser.py isn't a package module, it's loaded by path
+spec = importlib.util.spec_from_file_location("pasrser", os.path.join(ROOT, "emoji", "pasrser.py"))
+pasrser = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(pasrser)
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 100, pasrser.CHUNK_SIZE])
+def test_iter_rows(chunk_size):
+	with open(FIXTURE, 'rb') as f:
+		expected = [i for i in f.read().split(b"</table>")[0].split(b"\n") if i.startswith(b"<tr>")]
+	with open(FIXTURE, 'rb') as f:
+		rows = list(pasrser.iter_rows(f, chunk_size))
+	# only the rows of the first table
+	assert rows == expected
+	assert len(rows) == 5
+
+def test_parse_row():
+	with open(FIXTURE, 'rb') as f:
+		rows = list(pasrser.iter_rows(f))
+	assert pasrser.parse_row(rows[0]) is None
+	assert pasrser.parse_row(rows[1]) == ("1f600", b"\x89PNG grinning face", "grinning face")
+	# no apple image
+	assert pasrser.parse_row(rows[3]) is None
+
+def test_extract(tmp_path):
+	assert pasrser.extract(FIXTURE, str(tmp_path)) == 3
+	assert read_descriptions(str(tmp_path / "description.csv")) == {
+		"1f600" : "grinning face",
+		"1f602" : "face with tears of joy",
+		"0023_fe0f_20e3" : "keycap: #",
+	}
+	atlas = EmojiAtlas(str(tmp_path / "images.atlas"))
+	assert len(atlas) == 3
+	assert atlas.get("1f602") == b"\x89PNG face with tears of joy"
+	assert "2764" not in atlas
+
+@pytest.mark.parametrize("codes", [
+	["0023_fe0f_20e3"],
+	["1f468_200d_1f469_200d_1f467"],
+	["1f468_200d_1f469_200d_1f467_200d_1f466"],
+	["1f469_200d_2764_fe0f_200d_1f48b_200d_1f468", "2764"],
+])
+def test_matcher_longest(codes):
+	# the whole sequence, not the emojis it's made of
+	matcher = get_matcher()
+	text = "a " + " b ".join(map(code_to_text, codes)) + " c"
+	assert matcher.findall(text) == codes
+
+def test_matcher_parts():
+	# a ZWJ sequence that isn't an emoji is the emojis around the joiner
+	matcher = get_matcher()
+	assert matcher.findall(code_to_text("1f468_200d_1f469")) == ["1f468", "1f469"]
+	# a family cut short matches the shorter family
+	assert matcher.findall(code_to_text("1f468_200d_1f469_200d_1f467_200d")) == ["1f468_200d_1f469_200d_1f467"]
+
+def test_matcher_variation_selector():
+	matcher = get_matcher()
+	assert matcher.findall("#\u20e3 1\u20e3") == ["0023_fe0f_20e3", "0031_fe0f_20e3"]
+	kiss = code_to_text("1f469_200d_2764_fe0f_200d_1f48b_200d_1f468")
+	assert matcher.findall(kiss.replace("\ufe0f", "")) == ["1f469_200d_2764_fe0f_200d_1f48b_200d_1f468"]
+
+def test_matcher_plain_text():
+	# "#" and digits start keycaps, but aren't emojis on their own
+	matcher = get_matcher()
+	assert matcher.findall("#1 at 12:30, 100% # 7") == []
+	assert matcher.count(["#1", "1\ufe0f\u20e3 #\ufe0f\u20e3", "#\ufe0f"]) == {"0031_fe0f_20e3" : 1, "0023_fe0f_20e3" : 1}
+
+def test_matcher_descriptions():
+	matcher = EmojiMatcher({"1f600" : "grinning face", "0023_fe0f_20e3" : "keycap: #"})
+	assert list(matcher.finditer("x\U0001f600#\ufe0f\u20e3#")) == [(1, 1, "1f600"), (2, 3, "0023_fe0f_20e3")]
@@ -0,0 +1,68 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from datetime import date, datetime
+
+import whatsapp_parser
+from utils.index import TimeIndex, required_literal
+from bench import generate
+
+@pytest.mark.parametrize("pattern", [r"\x6fk", r"\u05d7\u05d7", r"\U0001F602", r"\N{HEBREW LETTER HET}", r"\0", r"(o)\1k"])
+def test_required_literal_code_escapes(pattern):
+	assert required_literal(pattern) == ""
+
+def test_required_literal_plain():
+	assert required_literal(r"hello\d+world") == "hello"
+	assert required_literal(r"\.com") == ".com"
+
+@pytest.mark.parametrize("pattern, literal", [(r"[x\]good]", ""), (r"[\]abc]", ""), (r"[]abc]", ""), (r"[^]abc]", ""), (r"[x\]]good", "good"), (r"[a-z\\]good", "good")])
+def test_required_literal_sets(pattern, literal):
+	# the set ends at the first unescaped "]"
+	assert required_literal(pattern) == literal
+
+@pytest.mark.parametrize("pattern", [r"\x6fk", r"\u05d7\u05d7", r"y\x65s", r"no\b", "wtf", r"[x\]good]"])
+def test_get_messages_index(tmp_path, pattern):
+	file_name = str(tmp_path / "chat.txt")
+	generate.write(file_name, 2000)
+	d = whatsapp_parser.Data(file_name)
+	d.init()
+
+	scanned = d.get_messages(pattern)
+	d.get_text_index()
+	assert scanned
+	assert d.get_messages(pattern) == scanned
+
+@pytest.mark.parametrize("minutes", [None, [0, 600, 1439, 30]])
+def test_time_index_dates(minutes):
+	days = [date(2016, 1, 1).toordinal(), date(2016, 1, 2).toordinal(), date(2016, 1, 2).toordinal(), date(2016, 1, 3).toordinal()]
+	index = TimeIndex(days, minutes)
+	# a date is its midnight
+	assert list(index.positions(date(2016, 1, 2), date(2016, 1, 3))) == list(index.positions(datetime(2016, 1, 2), datetime(2016, 1, 3)))
+	assert list(index.positions(date(2016, 1, 2))) == [1, 2, 3]
+
+def test_filtered_dates_order(monkeypatch):
+	whatsapp_time_statistics = pytest.importorskip("whatsapp_time_statistics")
+	dates = [datetime(2016, 1, i) for i in (3, 1, 5, 2, 4)]
+	start, end = datetime(2016, 1, 2), datetime(2016, 1, 4)
+	expected = [datetime(2016, 1, 2), datetime(2016, 1, 3)]
+	assert whatsapp_time_statistics.get_filtered_dates(sorted(dates), start, end) == expected
+	assert whatsapp_time_statistics.get_filtered_dates(dates, start, end) == expected
+
+	# the index of a list is built once
+	monkeypatch.setattr(whatsapp_time_statistics.utils.index, "TimeIndex", None)
+	assert whatsapp_time_statistics.get_filtered_dates(dates, start) == expected + [datetime(2016, 1, 4), datetime(2016, 1, 5)]
+
+def test_filtered_dates_lines(tmp_path):
+	whatsapp_time_statistics = pytest.importorskip("whatsapp_time_statistics")
+	file_name = str(tmp_path / "chat.txt")
+	generate.write(file_name, 2000)
+	d = whatsapp_parser.Data(file_name)
+	d.init()
+	dates = [i[0] for i in d.lines]
+	start, end = dates[500].replace(hour=10, minute=30), dates[1500]
+	assert whatsapp_time_statistics.get_filtered_dates(d.lines, start, end) == [i for i in dates if start <= i < end]
+	assert whatsapp_time_statistics.get_filtered_dates(dates, start, end) == [i for i in dates if start <= i < end]
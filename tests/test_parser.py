@@ -0,0 +1,191 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import whatsapp_parser
+
+def write_ambiguous(file_name, messages=300):
+	# hebrew "5/3/16" messages, then a single "25/3/16" one that settles the order
+	with open(file_name, 'w', encoding="utf8") as f:
+		for i in range(messages):
+			f.write("5/3/16, 10:%02d - User: %s\n" % (i % 60, "שלום " * 10))
+		f.write("25/3/16, 11:00 - User: done\n")
+
+@pytest.mark.parametrize("mapped, kwargs", [(False, {}), (False, {"streaming": True}), (False, {"shards": 2}), (True, {})])
+def test_dayfirst_same_in_every_mode(tmp_path, mapped, kwargs):
+	import whatsapp_time_statistics
+	file_name = str(tmp_path / "chat.txt")
+	# the last header is past the first CHUNK_SIZE bytes
+	write_ambiguous(file_name, 20000)
+	assert os.path.getsize(file_name) > whatsapp_parser.CHUNK_SIZE
+
+	d = whatsapp_parser.Data(file_name, mapped=mapped)
+	d.init(**kwargs)
+	assert d.dayfirst is True
+	assert [i[0].month for i in (d.lines[0], d.lines[-1])] == [3, 3]
+
+	# whatsapp_time_statistics reads the same dates out of the same file
+	with open(file_name, encoding="utf8") as f:
+		dates = whatsapp_time_statistics.get_dates(whatsapp_time_statistics.get_full_dates(f.read()))
+	assert dates == [i[0] for i in d.lines]
+	assert whatsapp_time_statistics.get_months(dates) == d.aggregates.months
+
+def test_dayfirst_appended(tmp_path):
+	file_name = str(tmp_path / "chat.txt")
+	write_ambiguous(file_name, 10)
+	with open(file_name, encoding="utf8") as f:
+		lines = f.readlines()
+	with open(file_name, 'w', encoding="utf8") as f:
+		f.writelines(lines[:-1])
+	d = whatsapp_parser.Data(file_name, cache=True)
+	d.init()
+	assert d.dayfirst is False
+
+	# the appended "25/3/16" turns the cached dates around, so the cache is dropped
+	with open(file_name, 'a', encoding="utf8") as f:
+		f.write(lines[-1])
+	d = whatsapp_parser.Data(file_name, cache=True)
+	d.init()
+	assert d.dayfirst is True
+	assert d.lines[0][0].month == 3
+
+def test_stages(tmp_path):
+	file_name = str(tmp_path / "chat.txt")
+	write_ambiguous(file_name, 10)
+	d = whatsapp_parser.Data(file_name, stats=True)
+	d.init()
+	names = [i.name for i in d.stats.stages]
+	assert names[:3] == ["read", "split", "parse"]
+	assert d.stats.stages[1].items == 11
+
+def test_cached_word_counts(tmp_path, monkeypatch):
+	from bench import generate
+	lines = list(generate.generate(1000))
+	file_name = str(tmp_path / "chat.txt")
+	with open(file_name, 'w', encoding="utf8") as f:
+		f.writelines(lines[:600])
+	whatsapp_parser.Data(file_name, cache=True).init()
+	with open(file_name, 'a', encoding="utf8") as f:
+		f.writelines(lines[600:])
+
+	full = whatsapp_parser.Data(file_name)
+	full.init()
+	expected = full.get_most_common_words(0)
+
+	# the appended lines update the cached counters, nothing is tokenized again
+	monkeypatch.setattr(whatsapp_parser.utils.terms.DocumentTermMatrix, "__init__", None)
+	d = whatsapp_parser.Data(file_name, cache=True)
+	d.init()
+	assert dict(d.get_most_common_words(0)) == dict(expected)
+	assert d.words_histogram == full.words_histogram
+	user = full.aggregates.users[0]
+	assert dict(d.get_most_common_words(0, user=user)) == dict(full.get_most_common_words(0, user=user))
+
+@pytest.mark.parametrize("mapped, kwargs", [(False, {}), (False, {"streaming": True}), (True, {})])
+def test_user_messages(tmp_path, mapped, kwargs):
+	from bench import generate
+	file_name = str(tmp_path / "chat.txt")
+	generate.write(file_name, 500)
+	d = whatsapp_parser.Data(file_name, mapped=mapped)
+	d.init(**kwargs)
+	aggregates = d.aggregates
+	# the users can be renamed without counting again
+	d.get_users(anonymize=True)
+	assert d.aggregates is aggregates
+
+	expected = [[] for i in d._users]
+	for date, minutes, user, message, message_type in d.lines:
+		if message_type == 0 and user in d._users:
+			expected[d._users.index(user)].append(message)
+	assert d.get_all_user_messages() == expected
+	assert all(isinstance(i, int) for ids in aggregates.messages for i in ids)
+
+@pytest.mark.parametrize("stop_after_another", [True, False])
+def test_following_messages_same_user(tmp_path, stop_after_another):
+	from bench import generate
+	file_name = str(tmp_path / "chat.txt")
+	generate.write(file_name, 1000, users=3)
+	d = whatsapp_parser.Data(file_name)
+	d.init()
+	is_media = lambda x: x[-1] == 1
+	# the fast path jumps over the runs, the function checks every message
+	assert d.get_following_messages(
+		is_media, 5, stop_after_another, exclude_same_user=True
+	) == d.get_following_messages(
+		is_media, 5, stop_after_another, exclude_function=whatsapp_parser.is_same_user
+	)
+
+def test_cache_touched(tmp_path, monkeypatch):
+	from bench import generate
+	file_name = str(tmp_path / "chat.txt")
+	generate.write(file_name, 100)
+	whatsapp_parser.Data(file_name, cache=True).init()
+	st = os.stat(file_name)
+	os.utime(file_name, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+
+	# hashed once, then the new mtime is in the cache
+	assert whatsapp_parser.Data(file_name, cache=True).load_cache()
+	def file_hash(*args):
+		raise AssertionError("hashed again")
+	monkeypatch.setattr(whatsapp_parser, "file_hash", file_hash)
+	assert whatsapp_parser.Data(file_name, cache=True).load_cache()
+
+def test_cache_stale_classes(tmp_path):
+	import pickle
+	import types
+	file_name = str(tmp_path / "chat.txt")
+	open(file_name, 'w').close()
+	# a pickle of a class that doesn't exist anymore
+	module = types.ModuleType("gone")
+	module.Gone = type("Gone", (object,), {"__module__" : "gone"})
+	sys.modules["gone"] = module
+	with open(file_name + whatsapp_parser.CACHE_SUFFIX, 'wb') as f:
+		pickle.dump({"version" : 0, "lines" : module.Gone()}, f)
+	del module.Gone
+	assert whatsapp_parser.Data(file_name, cache=True).load_cache() is False
+	del sys.modules["gone"]
+	assert whatsapp_parser.Data(file_name, cache=True).load_cache() is False
+
+@pytest.mark.parametrize("kwargs", [{}, {"streaming": True}, {"shards": 2}])
+def test_cache_appended_while_parsing(tmp_path, monkeypatch, kwargs):
+	from bench import generate
+	lines = list(generate.generate(1000))
+	file_name = str(tmp_path / "chat.txt")
+	with open(file_name, 'w', encoding="utf8") as f:
+		f.writelines(lines[:600])
+
+	# the export grows after the parse, before the cache is saved
+	aggregate = whatsapp_parser.Data.aggregate
+	def append_then_aggregate(self):
+		with open(file_name, 'a', encoding="utf8") as f:
+			f.writelines(lines[600:])
+		monkeypatch.setattr(whatsapp_parser.Data, "aggregate", aggregate)
+		return aggregate(self)
+	monkeypatch.setattr(whatsapp_parser.Data, "aggregate", append_then_aggregate)
+	d = whatsapp_parser.Data(file_name, cache=True)
+	d.init(**kwargs)
+	assert len(d.lines) < 1000
+
+	full = whatsapp_parser.Data(file_name)
+	full.init()
+	d = whatsapp_parser.Data(file_name, cache=True)
+	d.init()
+	assert list(d.lines) == list(full.lines)
+
+@pytest.mark.parametrize("messages, shards", [(20, 2), (20, 3), (20, 7), (20, 50), (2000, 7)])
+def test_shards_same_as_serial(tmp_path, messages, shards):
+	from bench import generate
+	file_name = str(tmp_path / "chat.txt")
+	# a fifth of the text messages span two lines
+	generate.write(file_name, messages, multiline=0.2)
+	serial = whatsapp_parser.Data(file_name)
+	serial.init()
+	assert any('\n' in i[3] for i in serial.lines)
+
+	# (20, 50) has more shards than messages
+	d = whatsapp_parser.Data(file_name)
+	d.init(shards=shards)
+	assert list(d.lines) == list(serial.lines)
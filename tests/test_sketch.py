@@ -0,0 +1,78 @@
+import os
+import sys
+import random
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+from collections import Counter
+
+from utils.sketch import CountMinSketch, HeavyHitters, HyperLogLog, WordSketch
+
+def skewed(amount, words=2000, seed=0):
+	# amount words out of words distinct ones, word i about 1 / (i + 1) as common as the first
+	rng = random.Random(seed)
+	weights = [1. / (i + 1) for i in range(words)]
+	return rng.choices(["word%d" % i for i in range(words)], weights, k=amount)
+
+def test_count_min_never_below():
+	stream = skewed(50000)
+	sketch = CountMinSketch(epsilon=0.01)
+	for word in stream:
+		sketch.add(word)
+
+	counts = Counter(stream)
+	assert sketch.total == len(stream)
+	for word, count in counts.items():
+		assert count <= sketch.estimate(word)
+	# and within epsilon * total for almost all of them
+	over = sum(sketch.estimate(w) - c > 0.01 * len(stream) for w, c in counts.items())
+	assert over <= 0.01 * len(counts) + 1
+
+@pytest.mark.parametrize("precision, amount", [(14, 100), (14, 50000), (10, 50000)])
+def test_hyperloglog_error(precision, amount):
+	sketch = HyperLogLog(precision)
+	for i in range(amount):
+		sketch.add("item%d" % i)
+	# 4 standard errors
+	error = 1.04 / (2 ** precision) ** 0.5
+	assert abs(sketch.count() - amount) <= 4 * error * amount + 1
+
+def test_merge_is_union():
+	first, second = skewed(20000, seed=1), skewed(20000, seed=2)
+	users = ["user%d" % i for i in range(300)]
+
+	def build(words, users):
+		sketch = WordSketch(capacity=20)
+		sketch.update(zip(users, [[w] for w in words]))
+		return sketch
+
+	union = build(first + second, users[:200] * 100 + users[100:] * 100)
+	merged = build(first, users[:200] * 100).merge(build(second, users[100:] * 100))
+	assert merged.words.sketch.counts == union.words.sketch.counts
+	assert merged.words.sketch.total == union.words.sketch.total
+	assert merged.vocabulary.registers == union.vocabulary.registers
+	assert merged.users.registers == union.users.registers
+	assert merged.distinct_users() == union.distinct_users()
+	assert [i[0] for i in merged.most_common(10)] == [i[0] for i in union.most_common(10)]
+
+def test_merge_different_sizes():
+	with pytest.raises(Exception):
+		CountMinSketch(0.01).merge(CountMinSketch(0.001))
+	with pytest.raises(Exception):
+		HyperLogLog(10).merge(HyperLogLog(12))
+
+def test_heavy_hitters_top():
+	stream = skewed(100000)
+	sketch = HeavyHitters(capacity=50)
+	for word in stream:
+		sketch.add(word)
+
+	top = Counter(stream).most_common(10)
+	found = sketch.most_common(10)
+	assert set(i[0] for i in found) == set(i[0] for i in top)
+	# least common first, and never below the real counts
+	assert [i[1] for i in found] == sorted(i[1] for i in found)
+	counts = Counter(stream)
+	assert all(counts[w] <= c for w, c in found)
@@ -1,2 +1,7 @@
 import utils.plot
-import utils.date
\ No newline at end of file
+import utils.date
+import utils.index
+import utils.emoji
+import utils.stats
+import utils.terms
+import utils.sketch
\ No newline at end of file
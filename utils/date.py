@@ -1,5 +1,60 @@
 from datetime import datetime
-from dateutil.parser import parse as parse_date
+
+# two digit years are placed within 50 years of now, like dateutil does
+_NOW_YEAR = datetime.now().year
 
 DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
 MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+# day number (datetime.toordinal) of numpy's datetime64 epoch
+EPOCH_DAY = datetime(1970, 1, 1).toordinal()
+
+def parse_date(*args, **kwargs):
+	# dateutil is only imported when a date is actually parsed
+	from dateutil.parser import parse
+	return parse(*args, **kwargs)
+
+# memoized results of parse_day / day_to_date, thousands of messages share a day
+_days = {False: {}, True: {}}
+_dates = {}
+
+def parse_day(date, dayfirst=False):
+	"""
+	parses the "m/d/yy" (or "m/d/yyyy") date of a message header into a day
+	number (datetime.toordinal), anything after a ',' is ignored.
+	gives the same date as parse_date (dateutil) for this format: the month
+	comes first unless dayfirst, and the two are swapped when the month
+	can't be a month.
+	"""
+	day = _days[dayfirst].get(date)
+	if day is None:
+		month, day, year = date.split(',', 1)[0].split('/')
+		month, day, year = int(month), int(day), int(year)
+		if dayfirst:
+			month, day = day, month
+		if month > 12:
+			month, day = day, month
+		if year < 100:
+			year += _NOW_YEAR // 100 * 100
+			if year >= _NOW_YEAR + 50:
+				year -= 100
+			elif year < _NOW_YEAR - 50:
+				year += 100
+		day = _days[dayfirst][date] = datetime(year, month, day).toordinal()
+	return day
+
+def parse_minutes(time):
+	# "HH:MM" -> minutes since midnight
+	return int(time[:2]) * 60 + int(time[3:5])
+
+def parse_date_and_time(date, dayfirst=False):
+	# "[date], [time]" -> (day number, minutes), see parse_day
+	date, time = date.split(", ", 1)
+	return parse_day(date, dayfirst), parse_minutes(time)
+
+def day_to_date(day):
+	# day number -> datetime, the same object for every message of that day
+	date = _dates.get(day)
+	if date is None:
+		date = _dates[day] = datetime.fromordinal(day)
+	return date
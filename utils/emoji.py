@@ -0,0 +1,216 @@
+import io
+import os
+import re
+import mmap
+import struct
+
+from collections import Counter
+
+EMOJI_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "emoji")
+
+# "[code],[description]" per line, a code is the hex code points joined by '_'
+# e.g. "0023_fe0f_20e3,Keycap NUMBER SIGN"
+DESCRIPTION_FILE = os.path.join(EMOJI_DIR, "description.csv")
+
+# all the emoji images packed in one file, see EmojiAtlas
+ATLAS_FILE = os.path.join(EMOJI_DIR, "images.atlas")
+ATLAS_MAGIC = b"EMJATLS1"
+# the offset of the index and the magic, at the end of the atlas
+ATLAS_TRAILER = struct.Struct("<Q8s")
+
+# the variation selector that asks for the emoji presentation, often left out
+VARIATION_SELECTOR = "\ufe0f"
+
+# marks the end of an emoji in a trie node
+_END = None
+
+def code_to_text(code):
+	# "0023_fe0f_20e3" -> "#\ufe0f\u20e3"
+	return ''.join(chr(int(i, 16)) for i in code.split('_'))
+
+def read_descriptions(file_name=DESCRIPTION_FILE):
+	# {code: description} of description.csv
+	descriptions = {}
+	with open(file_name, encoding="utf8") as f:
+		for line in f:
+			line = line.rstrip("\n")
+			if line:
+				code, description = line.split(',', 1)
+				descriptions[code] = description
+	return descriptions
+
+class EmojiMatcher(object):
+	"""
+	finds the emojis of description.csv in text, in a single pass.
+	all the code sequences (many are several code points long, like
+	"0023_fe0f_20e3") are compiled into a trie of characters, and at every
+	position the longest emoji that starts there is matched.
+	the sequences are also matched without their VARIATION_SELECTOR
+
+	a regex of the first characters of all the emojis jumps between the
+	positions where an emoji may start, so plain text is skipped in C
+	"""
+
+	def __init__(self, descriptions=None):
+		self.descriptions = read_descriptions() if descriptions is None else descriptions
+		self.trie = {}
+		for code in sorted(self.descriptions):
+			text = code_to_text(code)
+			self._insert(text, code)
+			if VARIATION_SELECTOR in text:
+				self._insert(text.replace(VARIATION_SELECTOR, ""), code, replace=False)
+
+		self._starts = re.compile('[' + ''.join(map(re.escape, self.trie)) + ']')
+
+	def _insert(self, text, code, replace=True):
+		if not text:
+			return
+		node = self.trie
+		for char in text:
+			node = node.setdefault(char, {})
+		if replace or _END not in node:
+			node[_END] = code
+
+	def finditer(self, text):
+		# yields (position, length, code) of the emojis in text
+		search = self._starts.search
+		match = search(text)
+		while match:
+			start = match.start()
+			node = self.trie
+			code = None
+			i = start
+			while i < len(text):
+				node = node.get(text[i])
+				if node is None:
+					break
+				i += 1
+				if _END in node:
+					code = node[_END]
+					end = i
+
+			if code is None:
+				match = search(text, start + 1)
+			else:
+				yield start, end - start, code
+				match = search(text, end)
+
+	def findall(self, text):
+		# the codes of the emojis in text
+		return [i[2] for i in self.finditer(text)]
+
+	def count(self, texts):
+		# Counter of the emoji codes in all the texts
+		counter = Counter()
+		for text in texts:
+			counter.update(self.findall(text))
+		return counter
+
+# the EmojiMatcher of description.csv, see get_matcher
+_matcher = None
+
+def get_matcher():
+	# description.csv is only read and compiled once something is matched
+	global _matcher
+	if _matcher is None:
+		_matcher = EmojiMatcher()
+	return _matcher
+
+###############################################
+############         ATLAS         ############
+###############################################
+
+class AtlasWriter(object):
+	"""
+	writes an atlas, the images are written as they are added
+		[image][image]...[index][ATLAS_TRAILER]
+	the index is a "[code],[offset],[length]\n" line per image, and goes
+	last so nothing has to be kept in memory while writing
+	"""
+
+	def __init__(self, file_name=ATLAS_FILE):
+		self.f = open(file_name, 'wb')
+		self.index = []
+
+	def add(self, code, data):
+		self.index.append("%s,%d,%d\n" % (code, self.f.tell(), len(data)))
+		self.f.write(data)
+
+	def close(self):
+		index_offset = self.f.tell()
+		self.f.write(''.join(self.index).encode("utf8"))
+		self.f.write(ATLAS_TRAILER.pack(index_offset, ATLAS_MAGIC))
+		self.f.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+class EmojiAtlas(object):
+	"""
+	reads an atlas written by AtlasWriter.
+	the file is memory mapped, so opening it only reads its index, and every
+	image is read (and decoded, see image) only when it is asked for
+	"""
+
+	def __init__(self, file_name=ATLAS_FILE):
+		with open(file_name, 'rb') as f:
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+		index_offset, magic = ATLAS_TRAILER.unpack(self._map[-ATLAS_TRAILER.size:])
+		if magic != ATLAS_MAGIC:
+			raise Exception("Not an emoji atlas")
+
+		self.index = {}
+		for line in self._map[index_offset:-ATLAS_TRAILER.size].decode("utf8").splitlines():
+			code, offset, length = line.split(',')
+			self.index[code] = (int(offset), int(length))
+		self._images = {}
+
+	def get(self, code):
+		# the raw (png) data of the emoji, None if it has no image
+		if code not in self.index:
+			return None
+		offset, length = self.index[code]
+		return self._map[offset:offset + length]
+
+	def image(self, code):
+		# the emoji as an image array for matplotlib, None if it has no image
+		if code not in self._images:
+			data = self.get(code)
+			if data is None:
+				return None
+			import matplotlib.image
+			self._images[code] = matplotlib.image.imread(io.BytesIO(data), format="png")
+		return self._images[code]
+
+	def extract(self, directory):
+		# writes the images back as loose [code].png files
+		for code in self.index:
+			with open(os.path.join(directory, code + ".png"), 'wb') as f:
+				f.write(self.get(code))
+
+	def __contains__(self, code):
+		return code in self.index
+
+	def __len__(self):
+		return len(self.index)
+
+def pack_directory(directory, file_name=ATLAS_FILE):
+	# packs the [code].png files of directory into an atlas
+	with AtlasWriter(file_name) as atlas:
+		for name in sorted(os.listdir(directory)):
+			if name.endswith(".png"):
+				with open(os.path.join(directory, name), 'rb') as f:
+					atlas.add(name[:-len(".png")], f.read())
+
+# the EmojiAtlas of ATLAS_FILE, see get_atlas
+_atlas = None
+
+def get_atlas():
+	global _atlas
+	if _atlas is None:
+		_atlas = EmojiAtlas()
+	return _atlas
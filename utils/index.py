@@ -0,0 +1,224 @@
+import re
+
+from array import array
+from bisect import bisect_left
+from itertools import islice
+
+MINUTES_PER_DAY = 24 * 60
+
+###############################################
+############         TIME          ############
+###############################################
+
+class TimeIndex(object):
+	"""
+	sorted index of the message times, answers date range queries with two
+	binary searches instead of a pass over all the messages.
+		days    - day numbers (datetime.toordinal) of the messages
+		minutes - minutes since midnight, None for a day resolution index
+
+	messages are already in time order in an export, so a time range is a
+	range of message positions and select() returns zero copy slices
+	(memoryview) of the columns. if they aren't, the index keeps the sorted
+	order and select() has to copy.
+	"""
+
+	def __init__(self, days, minutes=None):
+		self.days = days
+		self.minutes = minutes
+		if minutes is None:
+			self.keys = array('q', days)
+		else:
+			self.keys = array('q', (d * MINUTES_PER_DAY + m for d, m in zip(days, minutes)))
+
+		self.order = None
+		if not all(a <= b for a, b in zip(self.keys, islice(self.keys, 1, None))):
+			self.order = array('q', sorted(range(len(self.keys)), key=self.keys.__getitem__))
+			self.keys = array('q', [self.keys[i] for i in self.order])
+
+	def key(self, date):
+		# the smallest key of a message at or after date, a datetime or a date (midnight)
+		key = date.toordinal()
+		hour, minute = getattr(date, "hour", 0), getattr(date, "minute", 0)
+		partial = getattr(date, "second", 0) or getattr(date, "microsecond", 0)
+		if self.minutes is None:
+			partial = partial or hour or minute
+		else:
+			key = key * MINUTES_PER_DAY + hour * 60 + minute
+		return key + bool(partial)
+
+	def bounds(self, start=None, end=None):
+		# the (first, last + 1) sorted positions of start <= message < end
+		first = bisect_left(self.keys, self.key(start)) if start else 0
+		last = bisect_left(self.keys, self.key(end)) if end else len(self.keys)
+		return first, max(first, last)
+
+	def positions(self, start=None, end=None):
+		# the positions of the messages in [start, end) in time order
+		first, last = self.bounds(start, end)
+		if self.order is None:
+			return range(first, last)
+		return memoryview(self.order)[first:last]
+
+	def select(self, column, start=None, end=None):
+		# the values of column (e.g. days, user ids) of the messages in [start, end)
+		first, last = self.bounds(start, end)
+		if self.order is not None:
+			return [column[i] for i in self.order[first:last]]
+		try:
+			return memoryview(column)[first:last]
+		except TypeError:
+			return column[first:last]
+
+	def __len__(self):
+		return len(self.keys)
+
+###############################################
+############         TEXT          ############
+###############################################
+
+# characters with a special meaning in a regex, see required_literal
+_SPECIAL = set(".^$*+?{}[]\\|()")
+_OPTIONAL = set("*?{")
+# escapes that take the characters after them, see required_literal
+_CODE_ESCAPES = set("xuUN0123456789")
+
+def required_literal(pattern):
+	"""
+	the longest plain text that every match of the regex pattern contains,
+	or "" when no such text could be found.
+	this is conservative - it only looks at plain characters outside of any
+	group or set, and gives up on alternation
+	"""
+	if '|' in pattern:
+		return ""
+
+	runs = [""]
+	depth = 0
+	i = 0
+	while i < len(pattern):
+		char = pattern[i]
+		i += 1
+		if char == '\\':
+			char = pattern[i:i + 1]
+			i += 1
+			if char and char in _CODE_ESCAPES:
+				# \x6f, \u05d7, \N{...}, \1, \0... are followed by a code or a
+				# group number, which isn't plain text either
+				return ""
+			if not char or char.isalnum():
+				# \d, \w, \b, ... aren't plain characters
+				runs.append("")
+				continue
+		elif char == '[':
+			# skip the set, "]" right at its start is part of it and so is "\]"
+			i += pattern[i:i + 1] == '^'
+			i += pattern[i:i + 1] == ']'
+			while i < len(pattern) and pattern[i] != ']':
+				i += 1 + (pattern[i] == '\\')
+			i += 1
+			runs.append("")
+			continue
+		elif char in _SPECIAL:
+			depth += (char == '(') - (char == ')')
+			if char in _OPTIONAL and runs[-1]:
+				# the quantifier makes the character before it optional
+				runs[-1] = runs[-1][:-1]
+			if char == '{':
+				i = pattern.find('}', i) + 1 or len(pattern)
+			runs.append("")
+			continue
+
+		if depth:
+			continue
+		if pattern[i:i + 1] in _OPTIONAL:
+			runs.append("")
+			continue
+		runs[-1] += char
+
+	return max(runs, key=len)
+
+class TextIndex(object):
+	"""
+	inverted index of messages for fast lookups
+		words    - {WORDS_PATTERN token: ids of the messages that have it}
+		trigrams - {3 characters: ids of the messages that contain them}
+	ids are positions in messages, in ascending order.
+
+	substring and regex lookups only check the messages that contain all
+	the trigrams of the text (or of the required_literal of the regex)
+	"""
+
+	def __init__(self, messages, words_pattern):
+		self.messages = messages
+		self.words = {}
+		self.trigrams = {}
+		for message_id, message in enumerate(messages):
+			for word in set(words_pattern.findall(message)):
+				self.words.setdefault(word, array('i')).append(message_id)
+			for trigram in set(message[i:i + 3] for i in range(len(message) - 2)):
+				self.trigrams.setdefault(trigram, array('i')).append(message_id)
+
+	def word(self, word):
+		# ids of the messages that have word as a whole token
+		return self.words.get(word, array('i'))
+
+	def candidates(self, text):
+		# ids of the messages that may contain text, None if all of them may
+		if len(text) < 3:
+			return None
+
+		postings = sorted(
+			(self.trigrams.get(text[i:i + 3], ()) for i in range(len(text) - 2)),
+			key=len
+		)
+		ids = set(postings[0])
+		for posting in postings[1:]:
+			if not ids:
+				break
+			ids.intersection_update(posting)
+		return sorted(ids)
+
+	def substring(self, text):
+		# ids of the messages that contain text
+		ids = self.candidates(text)
+		if ids is None:
+			ids = range(len(self.messages))
+		return [i for i in ids if text in self.messages[i]]
+
+	def regex(self, pattern):
+		# ids of the messages the compiled pattern matches (search) in
+		ids = None
+		if not pattern.flags & (re.IGNORECASE | re.VERBOSE):
+			ids = self.candidates(required_literal(pattern.pattern))
+		if ids is None:
+			ids = range(len(self.messages))
+		search = pattern.search
+		return [i for i in ids if search(self.messages[i])]
+
+	def __len__(self):
+		return len(self.messages)
+
+###############################################
+############        REPLIES        ############
+###############################################
+
+def next_true(flags):
+	# for every position, the position of the next true flag after it (or len)
+	result = array('q', bytes(8 * len(flags)))
+	following = len(flags)
+	for i in range(len(flags) - 1, -1, -1):
+		result[i] = following
+		if flags[i]:
+			following = i
+	return result
+
+def run_ends(keys):
+	# for every position, the first position after it with a different key (or len)
+	result = array('q', bytes(8 * len(keys)))
+	end = len(keys)
+	for i in range(len(keys) - 1, -1, -1):
+		if i + 1 < len(keys) and keys[i + 1] != keys[i]:
+			end = i + 1
+		result[i] = end
+	return result
@@ -1,5 +1,3 @@
-import matplotlib.pyplot as plt
-
 from collections import Counter
 
 WIDTH = 1/1.5
@@ -7,6 +5,11 @@ WIDTH = 1/1.5
 def _rl(a):
 	return range(len(a))
 
+def _plt():
+	# matplotlib takes long to import, only import it once something is plotted
+	import matplotlib.pyplot as plt
+	return plt
+
 def hist(data, **kwargs):
 	# data should be a list
 	# create a dict of how many times each object appears
@@ -28,6 +31,7 @@ def hist(data, **kwargs):
 	bar([i[1] for i in czip], names=[i[0] for i in czip], **kwargs)
 
 def pie(data, labels=None, legend=True, legend_title=None, axis="equal", **kwargs):
+	plt = _plt()
 	if labels:
 		plt.pie(data, labels=labels)
 	else:
@@ -45,6 +49,7 @@ def pie(data, labels=None, legend=True, legend_title=None, axis="equal", **kwarg
 	plt.show()
 
 def bar(data, names=None, color="blue", title=None):
+	plt = _plt()
 	# create a bar 
 	plt.bar(_rl(data), data, WIDTH, color=color)
 
@@ -57,3 +62,30 @@ def bar(data, names=None, color="blue", title=None):
 
 	plt.show()
 
+
+def emoji_bar(data, codes, color="blue", title=None, zoom=0.25):
+	# a bar per emoji, with the emoji images (utils.emoji atlas) under the bars
+	plt = _plt()
+	from matplotlib.offsetbox import OffsetImage, AnnotationBbox
+	from utils.emoji import get_atlas
+
+	plt.bar(_rl(data), data, WIDTH, color=color)
+	plt.xticks(_rl(data), [""] * len(data))
+
+	atlas = get_atlas()
+	axes = plt.gca()
+	for i, code in enumerate(codes):
+		image = atlas.image(code)
+		if image is not None:
+			axes.add_artist(AnnotationBbox(
+				OffsetImage(image, zoom=zoom),
+				(i, 0),
+				xycoords=("data", "axes fraction"),
+				box_alignment=(0.5, 1),
+				frameon=False
+			))
+
+	if title:
+		plt.title(title)
+
+	plt.show()
@@ -0,0 +1,219 @@
+import math
+import heapq
+import hashlib
+
+from array import array
+from collections import Counter
+from operator import add, itemgetter
+
+def hash64(item):
+	"""
+	64 bit hash of a str. unlike hash() it's the same on every process, so
+	sketches built on separate processes (or runs) can be merged
+	"""
+	return int.from_bytes(hashlib.blake2b(item.encode("utf8"), digest_size=8).digest(), "little")
+
+class CountMinSketch(object):
+	"""
+	approximate counts of items in depth rows of width counters.
+	estimate(item) is never below the real count, and with probability
+	1 - delta it's above it by at most epsilon * total, where
+		width = ceil(e / epsilon)
+		depth = ceil(ln(1 / delta))
+	the defaults take 5 x 2719 counters (~106KB) no matter how many items
+	are added
+	"""
+
+	def __init__(self, epsilon=0.001, delta=0.01):
+		self.width = int(math.ceil(math.e / epsilon))
+		self.depth = int(math.ceil(math.log(1. / delta)))
+		self.counts = array('q', bytes(8 * self.width * self.depth))
+		self.total = 0
+
+	def _cells(self, h):
+		# the counter of every row, double hashing out of a single hash64
+		h1, h2 = h & 0xffffffff, (h >> 32) | 1
+		width = self.width
+		return [row * width + (h1 + row * h2) % width for row in range(self.depth)]
+
+	def add(self, item, count=1, h=None):
+		# adds count to item (whose hash64 is h), returns its new estimate
+		counts = self.counts
+		cells = self._cells(hash64(item) if h is None else h)
+		for cell in cells:
+			counts[cell] += count
+		self.total += count
+		return min([counts[cell] for cell in cells])
+
+	def estimate(self, item):
+		return min([self.counts[cell] for cell in self._cells(hash64(item))])
+
+	def merge(self, other):
+		# adds the counts of a sketch with the same epsilon and delta
+		if (self.width, self.depth) != (other.width, other.depth):
+			raise Exception("Can't merge sketches of different sizes")
+		self.counts = array('q', map(add, self.counts, other.counts))
+		self.total += other.total
+		return self
+
+class HeavyHitters(object):
+	"""
+	the capacity items with the highest CountMinSketch estimates, the
+	approximate top-k of a stream in fixed memory.
+	an item whose real count is above epsilon * total is missed only when
+	capacity items were estimated higher, and every estimate has the error
+	of CountMinSketch
+
+	the items are kept in a dict, with a heap of (estimate, item) to find
+	the smallest one. updated items leave stale heap entries behind, which
+	are skipped, and the heap is rebuilt when it grows past 4 * capacity
+	"""
+
+	def __init__(self, capacity=100, epsilon=0.001, delta=0.01):
+		self.capacity = capacity
+		self.sketch = CountMinSketch(epsilon, delta)
+		self.candidates = {}
+		self._heap = []
+
+	def _push(self, item, estimate):
+		self.candidates[item] = estimate
+		heapq.heappush(self._heap, (estimate, item))
+		if len(self._heap) > 4 * self.capacity:
+			self._heap = [(c, i) for i, c in self.candidates.items()]
+			heapq.heapify(self._heap)
+
+	def _smallest(self):
+		# the heap entry of the item with the lowest estimate
+		heap = self._heap
+		while heap[0][0] != self.candidates.get(heap[0][1]):
+			heapq.heappop(heap)
+		return heap[0]
+
+	def add(self, item, count=1, h=None):
+		estimate = self.sketch.add(item, count, h)
+		if item in self.candidates or len(self.candidates) < self.capacity:
+			self._push(item, estimate)
+		elif estimate > self._smallest()[0]:
+			del self.candidates[heapq.heappop(self._heap)[1]]
+			self._push(item, estimate)
+
+	def merge(self, other):
+		# merges the sketches, and keeps the best of both candidates by the merged estimates
+		self.sketch.merge(other.sketch)
+		candidates = set(self.candidates) | set(other.candidates)
+		self.candidates = dict(heapq.nlargest(
+			self.capacity,
+			((i, self.sketch.estimate(i)) for i in candidates),
+			key=itemgetter(1)
+		))
+		self._heap = [(c, i) for i, c in self.candidates.items()]
+		heapq.heapify(self._heap)
+		return self
+
+	def most_common(self, amount=10):
+		# the amount (item, estimate) pairs with the highest estimates, least common first
+		if not amount:
+			return sorted(self.candidates.items(), key=itemgetter(1))
+		return heapq.nlargest(amount, self.candidates.items(), key=itemgetter(1))[::-1]
+
+class HyperLogLog(object):
+	"""
+	approximate amount of distinct items in 2 ** precision one byte
+	registers. the standard error is 1.04 / sqrt(2 ** precision), 0.81% for
+	the default 14 (16KB). small amounts are estimated by linear counting
+	"""
+
+	def __init__(self, precision=14):
+		self.precision = precision
+		self.registers = bytearray(1 << precision)
+
+	def add(self, item, h=None):
+		h = hash64(item) if h is None else h
+		bits = 64 - self.precision
+		index = h >> bits
+		# the position of the first 1 bit in the rest of the hash
+		rank = bits - (h & ((1 << bits) - 1)).bit_length() + 1
+		if rank > self.registers[index]:
+			self.registers[index] = rank
+
+	def count(self):
+		m = len(self.registers)
+		alpha = 0.7213 / (1 + 1.079 / m)
+		estimate = alpha * m * m / sum([2. ** -i for i in self.registers])
+		zeros = self.registers.count(0)
+		if estimate <= 2.5 * m and zeros:
+			estimate = m * math.log(float(m) / zeros)
+		return int(round(estimate))
+
+	def merge(self, other):
+		# the union of both, for a sketch with the same precision
+		if self.precision != other.precision:
+			raise Exception("Can't merge sketches of different sizes")
+		self.registers = bytearray(map(max, self.registers, other.registers))
+		return self
+
+class WordSketch(object):
+	"""
+	fixed memory word and user statistics, the approximate version of the
+	exact word counts (see Data.get_sketch)
+		words      - HeavyHitters of the words, for the most common ones
+		vocabulary - HyperLogLog of the distinct words
+		users      - HyperLogLog of the distinct users
+	with the defaults it takes ~140KB however many words and users are
+	added, and sketches of separate chats merge into the sketch of all of
+	them (when built with the same arguments)
+	"""
+
+	def __init__(self, capacity=100, epsilon=0.001, delta=0.01, precision=14):
+		self.words = HeavyHitters(capacity, epsilon, delta)
+		self.vocabulary = HyperLogLog(precision)
+		self.users = HyperLogLog(precision)
+
+	def add(self, user, words=()):
+		# a message of user, with its words
+		self.users.add(user)
+		self.add_counts(Counter(words))
+
+	def add_counts(self, counts):
+		# {word: count} of any amount of messages
+		for word, count in counts.items():
+			h = hash64(word)
+			self.words.add(word, count, h)
+			self.vocabulary.add(word, h)
+
+	def update(self, messages, batch=10000):
+		"""
+		adds (user, words) messages. the words of every batch messages are
+		counted together first, so every distinct word of a batch is hashed
+		once, and the memory stays bounded by the batch
+		"""
+		users = set()
+		counts = Counter()
+		for i, (user, words) in enumerate(messages, 1):
+			users.add(user)
+			counts.update(words)
+			if not i % batch:
+				for user in users:
+					self.users.add(user)
+				self.add_counts(counts)
+				users, counts = set(), Counter()
+
+		for user in users:
+			self.users.add(user)
+		self.add_counts(counts)
+		return self
+
+	def merge(self, other):
+		self.words.merge(other.words)
+		self.vocabulary.merge(other.vocabulary)
+		self.users.merge(other.users)
+		return self
+
+	def most_common(self, amount=10):
+		return self.words.most_common(amount)
+
+	def distinct_words(self):
+		return self.vocabulary.count()
+
+	def distinct_users(self):
+		return self.users.count()
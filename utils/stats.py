@@ -0,0 +1,116 @@
+import json
+import time
+
+from contextlib import contextmanager, nullcontext
+
+try:
+	import resource
+except ImportError:
+	# not on windows, the peak memory is left out there
+	resource = None
+
+PROFILERS = ["cProfile", "tracemalloc"]
+
+class Stage(object):
+	"""
+	the measurements of one stage
+		seconds     - wall time
+		cpu_seconds - process cpu time
+		items       - what the stage went over (bytes, messages, users...),
+		              set by the stage itself
+		peak_bytes  - the peak memory (max rss) of the process after the
+		              stage, so the stage that raised it is the first to
+		              show the new value
+	"""
+
+	def __init__(self, name):
+		self.name = name
+		self.seconds = None
+		self.cpu_seconds = None
+		self.items = None
+		self.peak_bytes = None
+
+	def as_dict(self):
+		return dict(self.__dict__)
+
+# what a stage gets when there are no stats, setting its items does nothing
+_NO_STAGE = nullcontext(Stage(None))
+
+def no_stage():
+	return _NO_STAGE
+
+class Stats(object):
+	"""
+	records a Stage for every "with stats.stage(name) as stage:" block.
+	profile names a single stage to also run under profiler
+		cProfile    - self.profiles[name] is a pstats.Stats
+		tracemalloc - self.profiles[name] is a tracemalloc.Snapshot, and
+		              the stage gets "traced_peak_bytes" as well
+	"""
+
+	def __init__(self, profile=None, profiler="cProfile"):
+		if profiler not in PROFILERS:
+			raise Exception("Unknown profiler %s" % profiler)
+		self.stages = []
+		self.profile = profile
+		self.profiler = profiler
+		self.profiles = {}
+
+	@contextmanager
+	def stage(self, name):
+		stage = Stage(name)
+		self.stages.append(stage)
+
+		profiling = name == self.profile
+		if profiling:
+			stop = self._start_profiler(stage)
+
+		start, cpu_start = time.perf_counter(), time.process_time()
+		try:
+			yield stage
+		finally:
+			stage.seconds = time.perf_counter() - start
+			stage.cpu_seconds = time.process_time() - cpu_start
+			if profiling:
+				stop()
+			if resource:
+				# kilobytes on linux
+				stage.peak_bytes = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+	def _start_profiler(self, stage):
+		# starts the profiler, returns the function that stops it
+		if self.profiler == "cProfile":
+			import cProfile
+			import pstats
+			profiler = cProfile.Profile()
+			profiler.enable()
+
+			def stop():
+				profiler.disable()
+				self.profiles[stage.name] = pstats.Stats(profiler)
+		else:
+			import tracemalloc
+			tracemalloc.start()
+
+			def stop():
+				self.profiles[stage.name] = tracemalloc.take_snapshot()
+				stage.traced_peak_bytes = tracemalloc.get_traced_memory()[1]
+				tracemalloc.stop()
+		return stop
+
+	def as_dict(self):
+		return {"stages": [i.as_dict() for i in self.stages]}
+
+	def dump(self, file_name=None):
+		# the stats as JSON, also written to file_name if given
+		data = json.dumps(self.as_dict(), indent=1)
+		if file_name:
+			with open(file_name, 'w') as f:
+				f.write(data)
+		return data
+
+	def __str__(self):
+		return '\n'.join([
+			"%-12s %9.4fs %9.4fs cpu %10s items" % (i.name, i.seconds, i.cpu_seconds, i.items)
+			for i in self.stages
+		])
@@ -0,0 +1,156 @@
+import heapq
+
+from array import array
+from operator import itemgetter
+from collections import Counter
+
+class DocumentTermMatrix(object):
+	"""
+	sparse (CSR) document-term matrix of the words of some texts, built in a
+	single pass over them
+		words          - the vocabulary, term id -> word
+		vocabulary     - word -> term id
+		rows           - the key of every row (document)
+		indptr         - the terms of row i are indices[indptr[i]:indptr[i+1]]
+		indices        - term ids, ascending in every row
+		data           - the count of every (row, term)
+		term_counts    - the count of every term in all the rows
+		document_counts- the amount of rows every term is in
+
+	iterating gives every row as a list of (term id, count), the bag of
+	words format of gensim, so the matrix can be passed to gensim models as a
+	corpus (with id2word()) and is streamed row by row out of the arrays
+	"""
+
+	def __init__(self, texts, words_pattern, keys=None, rows=None):
+		"""
+		texts - the texts to count the words (words_pattern matches) of
+		keys  - the row key of every text, the texts with the same key are one
+		        document. without keys every text is its own row
+		rows  - the keys of the rows in order, sorted(set(keys)) when not
+		        given. texts whose key isn't in rows are skipped
+		"""
+		self._reset()
+
+		findall = words_pattern.findall
+		if keys is None:
+			for text in texts:
+				self._add_row(Counter(findall(text)))
+			self.rows = range(len(self))
+		else:
+			counters = {} if rows is None else dict((key, Counter()) for key in rows)
+			for key, text in zip(keys, texts):
+				counter = counters.get(key)
+				if counter is None:
+					if rows is not None:
+						continue
+					counter = counters[key] = Counter()
+				counter.update(findall(text))
+
+			self.rows = sorted(counters) if rows is None else list(rows)
+			for key in self.rows:
+				self._add_row(counters[key])
+
+	@classmethod
+	def from_counters(cls, counters, rows=None):
+		"""
+		a matrix of words that were already counted, a {word: count} per
+		row (e.g. Aggregates.words), rows are their keys
+		"""
+		matrix = cls.__new__(cls)
+		matrix._reset()
+		for counter in counters:
+			matrix._add_row(counter)
+		matrix.rows = range(len(matrix)) if rows is None else list(rows)
+		return matrix
+
+	def _reset(self):
+		self.words = []
+		self.vocabulary = {}
+		self.indptr = array('q', [0])
+		self.indices = array('i')
+		self.data = array('i')
+		self.term_counts = array('q')
+		self.document_counts = array('i')
+		self._row_index = None
+
+	def _add_row(self, counter):
+		terms = []
+		for word, count in counter.items():
+			term = self.vocabulary.get(word)
+			if term is None:
+				term = self.vocabulary[word] = len(self.words)
+				self.words.append(word)
+				self.term_counts.append(0)
+				self.document_counts.append(0)
+			self.term_counts[term] += count
+			self.document_counts[term] += 1
+			terms.append((term, count))
+
+		terms.sort()
+		self.indices.extend([i[0] for i in terms])
+		self.data.extend([i[1] for i in terms])
+		self.indptr.append(len(self.indices))
+
+	def row(self, key):
+		# the row number of a row key
+		if self._row_index is None:
+			self._row_index = dict((k, i) for i, k in enumerate(self.rows))
+		return self._row_index[key]
+
+	def frequencies(self):
+		# the share of every term out of all the words
+		total = float(sum(self.term_counts)) or 1.
+		return [i / total for i in self.term_counts]
+
+	def histogram(self, row=None):
+		# Counter of the words of one row, or of all of them
+		if row is None:
+			return Counter(dict(zip(self.words, self.term_counts)))
+		return Counter(dict((self.words[term], count) for term, count in self[row]))
+
+	def top(self, amount=10, row=None):
+		"""
+		the amount most common (word, count) pairs of one row (or of all of
+		them), least common first. uses a heap of size amount instead of
+		sorting the whole vocabulary
+		"""
+		if row is None:
+			counts = zip(self.words, self.term_counts)
+		else:
+			counts = [(self.words[term], count) for term, count in self[row]]
+		if not amount:
+			return sorted(counts, key=itemgetter(1))
+		return heapq.nlargest(amount, counts, key=itemgetter(1))[::-1]
+
+	def id2word(self):
+		# {term id: word}, the id2word of gensim models
+		return dict(enumerate(self.words))
+
+	def to_scipy(self):
+		# the matrix as a scipy.sparse.csr_matrix, scipy is only imported here
+		import numpy as np
+		from scipy.sparse import csr_matrix
+		return csr_matrix(
+			(
+				np.array(self.data, np.int32),
+				np.array(self.indices, np.int32),
+				np.array(self.indptr, np.int64)
+			),
+			shape=self.shape
+		)
+
+	@property
+	def shape(self):
+		return len(self.rows), len(self.words)
+
+	def __getitem__(self, row):
+		# the (term id, count) pairs of a row
+		start, end = self.indptr[row], self.indptr[row + 1]
+		return list(zip(self.indices[start:end], self.data[start:end]))
+
+	def __iter__(self):
+		return map(self.__getitem__, range(len(self)))
+
+	def __len__(self):
+		return len(self.indptr) - 1
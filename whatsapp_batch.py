@@ -0,0 +1,125 @@
+"""
+analyzes every export in a directory on its own process and prints the
+merged results
+
+	python whatsapp_batch.py [directory] "*.txt" --sketch
+"""
+
+import os
+import copy
+import glob
+import argparse
+
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from whatsapp_parser import Data
+
+###############################################
+############        ANALYSIS       ############
+###############################################
+
+def analyze(file_name, cache=True, sketch=False):
+	"""
+	parses a single export and returns only the compact results, so the
+	messages themselves are never sent back to the parent process
+		users          - the users, sorted
+		message_amount - per user amount of text messages
+		media_amount   - per user amount of media messages
+		word_amount    - per user amount of words
+		h_amount       - per user amount of H
+		words          - Counter of all the words
+		weekdays       - 7 counters, Mon-Sun
+		months         - 12 counters, Jan-Dec
+		hours          - 24 counters, one per hour of the day
+	with sketch, "words" is replaced by "sketch", the fixed size
+	utils.sketch.WordSketch of the chat (see Data.get_sketch)
+	"""
+	d = Data(file_name, cache=cache)
+	d.init()
+	aggregates = d.aggregates
+	result = {
+		"users"          : d._users,
+		"message_amount" : aggregates.message_amount,
+		"media_amount"   : aggregates.media_amount,
+		"word_amount"    : aggregates.word_amount,
+		"h_amount"       : aggregates.h_amount,
+		"weekdays"       : aggregates.weekdays,
+		"months"         : aggregates.months,
+		"hours"          : [sum(aggregates.minutes[i:i + 60]) for i in range(0, 24 * 60, 60)],
+	}
+	if sketch:
+		result["sketch"] = d.get_sketch()
+	else:
+		result["words"] = d.aggregates.words_histogram
+	return result
+
+def analyze_all(file_names, workers=None, cache=True, sketch=False):
+	"""
+	analyzes every export on its own process, see analyze.
+	returns {file_name: result} in the order of file_names
+	"""
+	file_names = list(file_names)
+	with ProcessPoolExecutor(workers) as executor:
+		results = executor.map(analyze, file_names, [cache] * len(file_names), [sketch] * len(file_names))
+		return dict(zip(file_names, results))
+
+def analyze_directory(directory, pattern="*.txt", workers=None, cache=True, sketch=False):
+	# analyze_all on the exports in directory that match pattern
+	return analyze_all(
+		sorted(glob.glob(os.path.join(directory, pattern))),
+		workers,
+		cache,
+		sketch
+	)
+
+###############################################
+############         MERGE         ############
+###############################################
+
+def merge(results):
+	"""
+	combines the results of analyze from several chats
+		words          - Counter of the words in all the chats
+		sketch         - the merged sketches, when the results have them
+		weekdays, months, hours - summed histograms
+		message_amount, media_amount - {user: amount} over all the chats
+	"""
+	merged = {
+		"words"          : Counter(),
+		"weekdays"       : [0] * 7,
+		"months"         : [0] * 12,
+		"hours"          : [0] * 24,
+		"message_amount" : Counter(),
+		"media_amount"   : Counter(),
+	}
+
+	for result in results:
+		if "sketch" not in result:
+			merged["words"].update(result["words"])
+		elif "sketch" in merged:
+			merged["sketch"].merge(result["sketch"])
+		else:
+			# the results' own sketches are left as they are
+			merged["sketch"] = copy.deepcopy(result["sketch"])
+		for name in ("weekdays", "months", "hours"):
+			merged[name] = [a + b for a, b in zip(merged[name], result[name])]
+		for name in ("message_amount", "media_amount"):
+			merged[name].update(dict(zip(result["users"], result[name])))
+
+	return merged
+
+if __name__ == '__main__':
+	parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+	parser.add_argument("directory", help="the directory of the exports")
+	parser.add_argument("pattern", nargs="?", default="*.txt", help="the exports in directory, \"*.txt\" by default")
+	parser.add_argument("--workers", type=int, help="amount of processes, the amount of CPUs by default")
+	parser.add_argument("--no-cache", dest="cache", action="store_false")
+	parser.add_argument("--sketch", action="store_true", help="count the words in fixed memory, see utils.sketch")
+	results = analyze_directory(**vars(parser.parse_args()))
+	for file_name, result in results.items():
+		print("%6d messages - %s" % (sum(result["message_amount"]), file_name))
+
+	merged = merge(results.values())
+	words = merged["sketch"].most_common(10)[::-1] if "sketch" in merged else merged["words"].most_common(10)
+	print('\n'.join(["%04d - %s" % (i[1], i[0][::-1]) for i in words]))
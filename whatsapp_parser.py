@@ -1,9 +1,17 @@
+import os
 import re
+import mmap
 import time
+import heapq
+import bisect
+import pickle
+import hashlib
 import utils
 import string
-import matplotlib.pyplot as plt
 
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from operator import itemgetter
 from collections import Counter
 
 # http://unicode.org/emoji/charts/full-emoji-list.html
@@ -11,6 +19,14 @@ from collections import Counter
 
 SUPPORTED_HOURS_DELTA = [0.5, 1, 2]
 
+# size of the byte blocks read by the streaming reader
+CHUNK_SIZE = 1 << 20
+
+# the parsed export is cached next to it, in [file_name] + CACHE_SUFFIX
+CACHE_SUFFIX = ".cache"
+# bump whenever the cached classes change
+CACHE_VERSION = 9
+
 MESSAGE_TYPE = {0 : "Message",
 				1 : "Media",
 				2 : "System"}
@@ -41,10 +57,505 @@ class Text(object):
 	H = "\u05d7"
 	H_PATTERN = re.compile("(HH+)".replace('H', H))
 
-	# split messages by the date pattern
-	# "[date], [time] - .*"
-	DATE_AND_TIME = "\d{1,2}/\d{1,2}/\d\d, \d\d\:\d\d"
-	DATE_PATTERN = re.compile(u'(' + DATE_AND_TIME + " - .*)\n")
+	# a message starts with a "[date], [time] - " header at the beginning of a line
+	# the date is "m/d/yy" or "dd/mm/yyyy", depending on the export (see detect_dayfirst)
+	DATE_AND_TIME = r"\d{1,2}/\d{1,2}/(?:\d{4}|\d\d), \d\d\:\d\d"
+	HEADER = DATE_AND_TIME + " - "
+	HEADER_PATTERN = re.compile("^(" + DATE_AND_TIME + ") - ", re.M)
+	HEADER_PATTERN_BYTES = re.compile(HEADER_PATTERN.pattern.encode("utf8"), re.M)
+	# a whole message, the header line and every line after it up to the next header
+	#	(date and time), (user, empty for system messages), (message)
+	MESSAGE_PATTERN = re.compile(
+		"^(" + DATE_AND_TIME + ") - "
+		"(?:([^\n]*?): )?"
+		"([^\n]*(?:\n(?!\\Z|" + HEADER + ")[^\n]*)*)",
+		re.M
+	)
+	# the same pattern for running directly on the raw (mapped) file
+	MESSAGE_PATTERN_BYTES = re.compile(MESSAGE_PATTERN.pattern.encode("utf8"), re.M)
+	# the position right before a line that starts with a message header
+	HEADER_START_BYTES = re.compile(("\n(?=" + HEADER + ")").encode("utf8"))
+
+	MEDIA = "<Media omitted>"
+	MEDIA_BYTES = MEDIA.encode("utf8")
+
+
+###############################################
+############        PARSING        ############
+###############################################
+
+def detect_dayfirst(dates):
+	"""
+	whether the "[date], [time]" strings of an export are day first
+	("dd/mm/yyyy") or month first ("m/d/yy").
+	the first date with a day above 12 settles it, when there is none
+	exports with 4 digit years are taken as day first.
+	dates is only read up to that date, so it can be a lazy iterator
+	"""
+	long_year = False
+	for date in dates:
+		first, second, year = date.split(',', 1)[0].split('/')
+		if int(first) > 12:
+			return True
+		if int(second) > 12:
+			return False
+		long_year = long_year or len(year) == 4
+	return long_year
+
+def text_dayfirst(text):
+	"""
+	detect_dayfirst of every header in text, the same dates
+	whatsapp_time_statistics looks at. the headers are matched lazily, up to
+	the first one that settles it
+	"""
+	return detect_dayfirst(i.group(1) for i in Text.HEADER_PATTERN.finditer(text))
+
+def file_dayfirst(file_name):
+	# text_dayfirst of the file, through a memory map so it's never read whole
+	with open(file_name, 'rb') as f:
+		if not os.fstat(f.fileno()).st_size:
+			return detect_dayfirst(())
+		with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+			return detect_dayfirst(i.group(1).decode("utf8") for i in Text.HEADER_PATTERN_BYTES.finditer(m))
+
+def split_messages(text):
+	"""
+	the single pass every parser here (and in WhatsappParse and
+	whatsapp_time_statistics) is built on.
+	returns a (date and time, user, message) tuple for every message in text
+		system message - "[date], [time] - [system_message_data]"
+		user   message - "[date], [time] - [user]: [user_message_data]"
+		user   media   - "[date], [time] - [user]: <Media omitted>"
+	user is empty for system messages.
+	messages that span several lines are kept whole, joined by '\n', and
+	anything before the first header is skipped
+
+	* ": " in the first line of a system message will return unwanted results
+		e.g. "[user] has changed the group name to \"abc: def\""
+	"""
+	return Text.MESSAGE_PATTERN.findall(text)
+
+def parse_message(date, user, message, dayfirst=False):
+	# a split_messages tuple -> a message tuple, see Data.parse_lines
+	if user:
+		# message_type = 1 if message == "<Media omitted>" else 0
+		message_type = int(message == Text.MEDIA)
+	else:
+		user = "system"
+		message_type = 2
+
+	day, minutes = utils.date.parse_date_and_time(date, dayfirst)
+	return (
+		utils.date.day_to_date(day), # date
+		minutes,
+		user,
+		message,
+		message_type
+	)
+
+def parse_messages(text, dayfirst=False):
+	# the message tuples of all the messages in text
+	for message in split_messages(text):
+		yield parse_message(*message, dayfirst=dayfirst)
+
+def read_chunks(file_name='w', chunk_size=CHUNK_SIZE, offset=0, end=None):
+	"""
+	reads the file (from offset, up to end) in blocks of chunk_size bytes and yields
+	decoded text blocks that always end right before a message header, so
+	every block holds whole messages and running split_messages on every
+	block separately gives the same messages as running it on the whole file.
+	the bytes from the last header of a block are carried into the next one,
+	which also keeps multi-byte utf8 characters in one piece.
+	"""
+	carry = b""
+	with open(file_name, 'rb') as f:
+		f.seek(offset)
+		while True:
+			block = f.read(chunk_size if end is None else max(0, min(chunk_size, end - f.tell())))
+			if not block:
+				break
+			block = carry + block
+			cut = last_header(block)
+			if not cut:
+				# no message ended in this block yet, keep reading
+				carry = block
+				continue
+			carry = block[cut:]
+			yield block[:cut].decode("utf8")
+
+	if carry:
+		yield carry.decode("utf8")
+
+def last_header(block):
+	# the start of the last line of block that starts with a message header, 0 if none
+	end = len(block)
+	while True:
+		end = block.rfind(b"\n", 0, end)
+		if end == -1:
+			return 0
+		if Text.HEADER_START_BYTES.match(block, end):
+			return end + 1
+
+def split_shards(file_name, shards, end=None):
+	"""
+	splits the file (up to end) into (start, end) byte ranges, about shards of them.
+	every split point is moved forward to the start of the next line that
+	starts with a message header, so no message is cut between two shards
+	"""
+	with open(file_name, 'rb') as f:
+		size = f.seek(0, 2) if end is None else min(end, f.seek(0, 2))
+		if not size:
+			return []
+		mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+	points = [0]
+	for i in range(1, shards):
+		match = Text.HEADER_START_BYTES.search(mapping, max(size * i // shards, points[-1]))
+		if not match:
+			break
+		if match.end() > points[-1]:
+			points.append(match.end())
+	mapping.close()
+
+	points.append(size)
+	return list(zip(points[:-1], points[1:]))
+
+def parse_shard(file_name, start, end, dayfirst=False):
+	# read_data + parse_lines for the bytes [start, end) of the file
+	with open(file_name, 'rb') as f:
+		f.seek(start)
+		data = f.read(end - start).decode("utf8")
+	return MessageTable(parse_messages(data, dayfirst))
+
+def parse_parallel(file_name, shards, dayfirst=False, end=None):
+	"""
+	parses the file (up to end) as shards parts on separate processes, see split_shards.
+	the shards are concatenated in order, which gives the same MessageTable
+	as the serial parse
+	"""
+	ranges = split_shards(file_name, shards, end)
+	if len(ranges) < 2:
+		return parse_shard(file_name, *ranges[0], dayfirst=dayfirst) if ranges else MessageTable()
+
+	starts, ends = zip(*ranges)
+	with ProcessPoolExecutor(len(ranges)) as executor:
+		tables = executor.map(parse_shard, [file_name] * len(ranges), starts, ends, [dayfirst] * len(ranges))
+		table = next(tables)
+		for i in tables:
+			table.extend(i)
+	return table
+
+
+def file_signature(file_name):
+	# cheap check for changes in the file, (size, mtime)
+	st = os.stat(file_name)
+	return st.st_size, st.st_mtime_ns
+
+def file_hash(file_name, size=None):
+	# sha1 of the file, or of only its first size bytes
+	h = hashlib.sha1()
+	with open(file_name, 'rb') as f:
+		while size is None or size > 0:
+			block = f.read(CHUNK_SIZE if size is None else min(size, CHUNK_SIZE))
+			if not block:
+				break
+			h.update(block)
+			if size is not None:
+				size -= len(block)
+	return h.hexdigest()
+
+###############################################
+############        STORAGE        ############
+###############################################
+
+class MessageColumns(object):
+	"""
+	columnar replacement for the list of message tuples in Data.lines
+		days    - int32 day numbers (datetime.toordinal)
+		minutes - int16 minutes since midnight
+		user_ids- int32 index into self.users (names are interned once)
+		types   - int8 of MESSAGE_TYPE
+	the message text is stored by the subclasses, see message()
+
+	indexing and iterating return the same tuples as Data.parse_lines,
+	so code written against the list keeps working, while column() and the
+	arrays themselves (buffer protocol, e.g. numpy.frombuffer) give cheap
+	access to a single field.
+	"""
+
+	def __init__(self):
+		self.days = array('i')
+		self.minutes = array('h')
+		self.user_ids = array('i')
+		self.types = array('b')
+		self.users = []
+		self._user_ids = {}
+		self._time_index = None
+
+	def _user_id(self, user):
+		user_id = self._user_ids.get(user)
+		if user_id is None:
+			user_id = self._user_ids[user] = len(self.users)
+			self.users.append(user)
+		return user_id
+
+	def _append(self, day, minutes, user, message_type):
+		self._time_index = None
+		self.days.append(day)
+		self.minutes.append(minutes)
+		self.user_ids.append(self._user_id(user))
+		self.types.append(message_type)
+
+	def date(self, index):
+		return utils.date.day_to_date(self.days[index])
+
+	def user(self, index):
+		return self.users[self.user_ids[index]]
+
+	def message(self, index):
+		raise NotImplementedError
+
+	def time_index(self):
+		# utils.index.TimeIndex of the messages, built on first use
+		if self._time_index is None:
+			self._time_index = utils.index.TimeIndex(self.days, self.minutes)
+		return self._time_index
+
+	def column(self, index):
+		# the columns of a message tuple, see Data.parse_lines
+		index %= 5
+		if index == 0:
+			return list(map(utils.date.day_to_date, self.days))
+		if index == 2:
+			return [self.users[i] for i in self.user_ids]
+		if index == 3:
+			return list(map(self.message, range(len(self))))
+		return (None, self.minutes, None, None, self.types)[index]
+
+	def iter_column(self, index):
+		# column() one value at a time, nothing is built for the whole column
+		index %= 5
+		if index == 0:
+			return map(utils.date.day_to_date, self.days)
+		if index == 2:
+			return map(self.users.__getitem__, self.user_ids)
+		if index == 3:
+			return map(self.message, range(len(self)))
+		return iter(self.column(index))
+
+	def __len__(self):
+		return len(self.types)
+
+	def __getitem__(self, index):
+		if isinstance(index, slice):
+			return [self[i] for i in range(*index.indices(len(self)))]
+		return (
+			self.date(index),
+			self.minutes[index],
+			self.user(index),
+			self.message(index),
+			self.types[index]
+		)
+
+	def __iter__(self):
+		return map(self.__getitem__, range(len(self)))
+
+
+class MessageTable(MessageColumns):
+	"""
+	in memory MessageColumns, all the message bodies are kept utf8 encoded in
+	one buffer and message i is self.text[offsets[i]:offsets[i+1]]
+	"""
+
+	def __init__(self, lines=()):
+		super(MessageTable, self).__init__()
+		self.text = bytearray()
+		self.offsets = array('q', [0])
+		for i in lines:
+			self.append(i)
+
+	def append(self, line):
+		date, minutes, user, message, message_type = line
+		self._append(date.toordinal(), minutes, user, message_type)
+		self.text += message.encode("utf8")
+		self.offsets.append(len(self.text))
+
+	def extend(self, table):
+		# appends all the messages of another MessageTable
+		self._time_index = None
+		user_ids = [self._user_id(i) for i in table.users]
+		self.days.extend(table.days)
+		self.minutes.extend(table.minutes)
+		self.user_ids.extend(array('i', [user_ids[i] for i in table.user_ids]))
+		self.types.extend(table.types)
+
+		base = len(self.text)
+		self.text += table.text
+		self.offsets.extend(array('q', [base + i for i in table.offsets[1:]]))
+
+	def message(self, index):
+		if index < 0:
+			index += len(self)
+		return self.text[self.offsets[index]:self.offsets[index + 1]].decode("utf8")
+
+
+class MappedLines(MessageColumns):
+	"""
+	read only, memory mapped MessageColumns.
+	MESSAGE_PATTERN_BYTES runs directly on the mapped file, and only the
+	headers (date, time, user) are decoded while parsing. message bodies are
+	kept as (start, end) offsets into the mapping and are decoded only when read.
+	"""
+
+	def __init__(self, file_name='w', dayfirst=False):
+		super(MappedLines, self).__init__()
+		self.starts = array('q')
+		self.ends = array('q')
+
+		with open(file_name, 'rb') as f:
+			# mmap can't map an empty file
+			self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if f.seek(0, 2) else b""
+
+		for match in Text.MESSAGE_PATTERN_BYTES.finditer(self._map):
+			day, minutes = utils.date.parse_date_and_time(match.group(1).decode("utf8"), dayfirst)
+			start, end = match.span(3)
+			if match.start(2) == -1:
+				user = "system"
+				message_type = 2
+			else:
+				user = match.group(2).decode("utf8")
+				message_type = int(
+					end - start == len(Text.MEDIA_BYTES)
+					 and
+					self._map[start:end] == Text.MEDIA_BYTES
+				)
+
+			self._append(day, minutes, user, message_type)
+			self.starts.append(start)
+			self.ends.append(end)
+
+	def message(self, index):
+		return self._map[self.starts[index]:self.ends[index]].decode("utf8")
+
+	def close(self):
+		if isinstance(self._map, mmap.mmap):
+			self._map.close()
+
+
+###############################################
+############      AGGREGATION      ############
+###############################################
+
+def scan_laughter(message):
+	"""
+	the lengths of the H runs (H_PATTERN) of a message and its amount of non
+	space characters, everything get_user_hpm needs out of one message.
+	the regex only runs on messages that have an H at all
+	"""
+	if Text.H in message:
+		runs = [len(i) for i in Text.H_PATTERN.findall(message)]
+	else:
+		runs = []
+	return runs, len(message) - message.count(' ')
+
+class Aggregates(object):
+	"""
+	all the per user counters of Data, built in a single pass over the
+	messages instead of one pass per user per counter.
+	every list is ordered like the users list it was created with
+		message_amount - amount of text messages (MESSAGE_TYPE 0)
+		media_amount   - amount of media messages (MESSAGE_TYPE 1)
+		word_amount    - amount of whitespace separated words
+		h_run_amount   - amount of H_PATTERN matches
+		h_run_lengths  - Counter of the lengths of the H_PATTERN matches
+		h_amount       - amount of H in the H_PATTERN matches
+		length         - amount of non space characters, counting the '\n'
+		                 that joins the messages in messages_by_user_combined
+		messages       - array of the indexes (in Data.lines) of the text
+		                 messages, decoded by Data.get_all_user_messages
+		words          - Counter of the WORDS_PATTERN matches
+	system messages and unknown users are skipped by the per user counters.
+	the time histograms count all the messages
+		size           - amount of messages counted
+		weekdays       - 7 counters, Mon-Sun
+		months         - 12 counters, Jan-Dec
+		minutes        - 1440 counters, one per minute of the day
+
+	the matches are counted straight into self.words and the global
+	self.words_histogram, which are cached and updated with appended lines
+	like every other counter. get_document_terms("user") is built from them
+	"""
+
+	def __init__(self, users):
+		self.users = list(users)
+		self._index = dict((u, i) for i, u in enumerate(self.users))
+		self.message_amount = [0] * len(users)
+		self.media_amount = [0] * len(users)
+		self.word_amount = [0] * len(users)
+		self.h_run_amount = [0] * len(users)
+		self.h_run_lengths = [Counter() for u in users]
+		self.h_amount = [0] * len(users)
+		self.length = [0] * len(users)
+		self.messages = [array('q') for u in users]
+		self.words = [Counter() for u in users]
+		self.words_histogram = Counter()
+		self.size = 0
+		self.weekdays = [0] * 7
+		self.months = [0] * 12
+		self.minutes = [0] * 24 * 60
+
+	def add_user(self, user):
+		"""
+		adds an empty user in its sorted place, e.g. a user that joined in
+		lines appended after the counters were built
+		"""
+		i = bisect.bisect(self.users, user)
+		self.users.insert(i, user)
+		self._index = dict((u, j) for j, u in enumerate(self.users))
+		for name in ("message_amount", "media_amount", "word_amount", "h_run_amount", "h_amount", "length"):
+			getattr(self, name).insert(i, 0)
+		self.h_run_lengths.insert(i, Counter())
+		self.messages.insert(i, array('q'))
+		self.words.insert(i, Counter())
+
+	def add(self, index, day, minutes, user, message, message_type):
+		"""
+		index - the index of the message in Data.lines
+		day   - day number (datetime.toordinal), ordinal 1 is a Monday
+		"""
+		self.size += 1
+		self.weekdays[(day - 1) % 7] += 1
+		self.months[utils.date.day_to_date(day).month - 1] += 1
+		self.minutes[minutes] += 1
+
+		i = self._index.get(user)
+		if i is None:
+			return
+
+		if message_type == 1:
+			self.media_amount[i] += 1
+		elif message_type == 0:
+			if self.message_amount[i]:
+				# the '\n' joining it to the previous message
+				self.length[i] += 1
+			self.message_amount[i] += 1
+			self.word_amount[i] += len(message.split())
+			runs, length = scan_laughter(message)
+			if runs:
+				self.h_run_amount[i] += len(runs)
+				self.h_run_lengths[i].update(runs)
+				self.h_amount[i] += sum(runs)
+			self.length[i] += length
+			self.messages[i].append(index)
+			words = Text.WORDS_PATTERN.findall(message)
+			self.words[i].update(words)
+			self.words_histogram.update(words)
+
+	def update(self, lines):
+		# lines - (day, minutes, user, message, message_type) tuples, the messages after self.size
+		for index, line in enumerate(lines, self.size):
+			self.add(index, *line)
+		return self
 
 
 class Data(object):
@@ -53,72 +564,259 @@ class Data(object):
 	############          INIT         ############
 	###############################################
 	
-	def init(self):
-		self.read_data()
-		self.parse_lines()
-		self.get_users()
-		self.get_all_words()
+	def __init__(self, file_name='w', mapped=False, cache=False, stats=None):
+		self.file_name = file_name
+		# parse through MappedLines instead of a list of tuples
+		self.mapped = mapped
+		# reuse / store the parse in [file_name] + CACHE_SUFFIX
+		self.cache = cache and not mapped
+		# a utils.stats.Stats (or True for a new one) to measure the stages of init / init_all
+		self.stats = utils.stats.Stats() if stats is True else stats
+
+	# measures a stage when self.stats is set, see utils.stats
+	def _stage(self, name):
+		if self.stats is None:
+			return utils.stats.no_stage()
+		return self.stats.stage(name)
+
+	def init(self, streaming=False, shards=None):
+		if self.cache:
+			with self._stage("load_cache") as stage:
+				loaded = self.load_cache()
+				stage.items = len(self.lines) if loaded else 0
+			if loaded:
+				return
+
+		# the export as it is before parsing, every parse stops at its size
+		# so the cache never claims bytes appended while parsing (see save_cache)
+		self.signature = file_signature(self.file_name)
+		end = self.signature[0]
+		if self.mapped:
+			with self._stage("parse") as stage:
+				self.map_lines()
+				stage.items = len(self.lines)
+		elif streaming:
+			with self._stage("parse") as stage:
+				# never hold the whole export in memory, see iter_lines
+				self.lines = MessageTable(self.iter_lines(end=end))
+				stage.items = len(self.lines)
+		elif shards:
+			with self._stage("parse") as stage:
+				self.parse_lines(shards, end)
+				stage.items = len(self.lines)
+		else:
+			with self._stage("read") as stage:
+				self.read_data(end=end)
+				stage.items = len(self.data)
+			# measures the "split" and "parse" stages
+			self.parse_lines()
+
+		with self._stage("users") as stage:
+			self.get_users()
+			stage.items = len(self.users)
+
+		with self._stage("aggregate") as stage:
+			# counts the words as well, see Aggregates
+			self.aggregate()
+			stage.items = len(self.lines)
+
+		if self.cache:
+			with self._stage("save_cache"):
+				self.save_cache()
 
 	def init_all(self):
 		self.init()
-		self.get_user_message_metadata()
-		self.get_user_message_metadata(True)
-		self.get_all_user_messages()
-		self.get_user_wpm()
-		self.get_user_hpm()
-		self.get_most_common_words()
-
-	def read_data(self, file_name='w'):
-		f = open(file_name, 'rb')
-		a = f.read()
+		with self._stage("metadata"):
+			self.get_user_message_metadata()
+			self.get_user_message_metadata(True)
+			self.get_all_user_messages()
+		with self._stage("wpm"):
+			self.get_user_wpm()
+		with self._stage("hpm"):
+			self.get_user_hpm()
+		with self._stage("words"):
+			self.get_most_common_words()
+
+	def read_data(self, file_name=None, end=None):
+		f = open(file_name or self.file_name, 'rb')
+		a = f.read(-1 if end is None else end)
 		f.close()
 		self.data = a.decode("utf8")
 		return self.data
 
 	# returns [date, time, user, message, message_type]
-	def parse_lines(self):
+	def parse_lines(self, shards=None, end=None):
 		"""
-		parses the data and splits into messages
+		parses the data and splits into messages, see split_messages
 		message can be one of 3 types
 			system message - "[date], [time] - [system_message_data]"
 			user   message - "[date], [time] - [user]: [user_message_data]"
 			user   media   - "[date], [time] - [user]: <Media omitted>"
 
-		this data is being parsed into a 2D array
+		this data is being parsed into a MessageTable, which acts as a 2D array
 			1st dimension is the messages by order
 			2nd dimension is a message tuple
 				content name - [date    , time          , user, message, message_type       ]
 				content type - [datetime, int of minutes, str , str    , int of MESSAGE_TYPE]
 
-		* ':' in a system message will return unwanted results
-			e.g. "[user] has changed the group name to \"abc:def\""
+		the order of the dates is detected once, in self.dayfirst
+
+		with shards, the file itself is split into that many parts, which are
+		parsed on separate processes (see parse_parallel), and self.data isn't
+		needed
 		"""
 
-		self.lines_raw = Text.DATE_PATTERN.findall(self.data)
+		if shards:
+			self.dayfirst = file_dayfirst(self.file_name)
+			self.lines = parse_parallel(self.file_name, shards, self.dayfirst, end)
+			return self.lines
 
-		self.lines = []
-		for i in self.lines_raw:
-			date, rest = i.split(" - ", 1)
-			if ':' in rest:
-				user, message = rest.split(": ", 1)
-				# message_type = 1 if message == "<Media omitted>" else 0
-				message_type = int(message == "<Media omitted>")
-			else:
-				user = "system"
-				message = rest
-				message_type = 2
+		self.dayfirst = text_dayfirst(self.data)
+		with self._stage("split") as stage:
+			messages = split_messages(self.data)
+			stage.items = len(messages)
 
-			temp_date = re.findall("^(\d{1,2}/\d{1,2}/\d\d), ", date)[0]
-			temp_hour = date[date.find(',')+2:]
-			self.lines.append((
-							utils.date.parse_date(temp_date), # date
-							int(temp_hour[:2]) * 60 + int(temp_hour[-2:]), # minutes
-							user,
-							message,
-							message_type
-						))
+		# the dates and the users are parsed here, message by message
+		with self._stage("parse") as stage:
+			self.lines = MessageTable(parse_message(*i, dayfirst=self.dayfirst) for i in messages)
+			stage.items = len(self.lines)
 		return self.lines
 
+	def iter_lines(self, file_name=None, chunk_size=CHUNK_SIZE, offset=0, end=None):
+		"""
+		streaming version of read_data + parse_lines.
+		reads the file chunk_size bytes at a time and yields the same message
+		tuples as parse_lines, without keeping self.data
+		"""
+		file_name = file_name or self.file_name
+		if self.__dict__.get("dayfirst") is None:
+			self.dayfirst = file_dayfirst(file_name)
+
+		for block in read_chunks(file_name, chunk_size, offset, end):
+			for line in parse_messages(block, self.dayfirst):
+				yield line
+
+	def map_lines(self, file_name=None):
+		"""
+		memory mapped version of read_data + parse_lines, see MappedLines
+		"""
+		file_name = file_name or self.file_name
+		self.dayfirst = file_dayfirst(file_name)
+		self.lines = MappedLines(file_name, self.dayfirst)
+		return self.lines
+
+	def save_cache(self, file_name=None):
+		"""
+		stores self.lines and self.aggregates in [file_name] + CACHE_SUFFIX
+		keyed by the size, mtime and sha1 of the export, see load_cache.
+		the size and mtime are the ones self.signature took before parsing,
+		and only those size bytes are hashed, so bytes appended since are
+		parsed by the next load_cache. "end" is where the parse stopped
+		"""
+		file_name = file_name or self.file_name
+		signature = self.__dict__.get("signature") or file_signature(file_name)
+		cache = {
+			"version" : CACHE_VERSION,
+			"key"     : signature + (file_hash(file_name, signature[0]),),
+			"end"     : signature[0],
+			"dayfirst": self.dayfirst,
+			"lines"   : self.lines,
+			"aggregates" : self.aggregates,
+		}
+
+		# write and rename, a killed process never leaves half a cache
+		temp_name = "%s%s.%d" % (file_name, CACHE_SUFFIX, os.getpid())
+		with open(temp_name, 'wb') as f:
+			pickle.dump(cache, f, pickle.HIGHEST_PROTOCOL)
+		os.replace(temp_name, file_name + CACHE_SUFFIX)
+
+	def load_cache(self, file_name=None):
+		"""
+		loads the parse stored by save_cache, returns False when there is no
+		cache or the export has changed since.
+		the export is only hashed when its size or mtime differ from the cache,
+		and the cache is saved again with the new ones so it's hashed once
+
+		exports grow by appending, so when the cached export is a prefix of
+		the current one only the new tail is parsed (see append_lines) and the
+		updated cache is saved
+		"""
+		file_name = file_name or self.file_name
+		try:
+			with open(file_name + CACHE_SUFFIX, 'rb') as f:
+				cache = pickle.load(f)
+		# a cache of an older version may refer to classes / modules that are gone
+		except (IOError, EOFError, ValueError, AttributeError, ImportError, pickle.UnpicklingError):
+			return False
+
+		if cache.get("version") != CACHE_VERSION:
+			return False
+
+		size, mtime, digest = cache["key"]
+		changed = appended = False
+		signature = file_signature(file_name)
+		if signature != (size, mtime):
+			new_size = signature[0]
+			if new_size < size or file_hash(file_name, size) != digest:
+				return False
+			changed = True
+			appended = new_size > size
+			# the appended dates may settle an order the cached ones couldn't
+			if appended and file_dayfirst(file_name) != cache["dayfirst"]:
+				return False
+
+		self.dayfirst = cache["dayfirst"]
+		self.lines = cache["lines"]
+		self.aggregates = cache["aggregates"]
+		self.get_users()
+
+		self.signature = signature
+		if appended:
+			self.append_lines(cache["end"], file_name, signature[0])
+		if changed:
+			self.save_cache(file_name)
+		return True
+
+	def append_lines(self, offset, file_name=None, end=None):
+		"""
+		parses the file from offset (up to end) and appends the messages to self.lines,
+		updating self.aggregates instead of rebuilding it. returns the amount
+		of new messages.
+		lines before the first header after offset are skipped, they can't be
+		added to a message that was already counted
+		"""
+		start = len(self.lines)
+		for line in self.iter_lines(file_name, offset=offset, end=end):
+			self.lines.append(line)
+			if line[2] != "system" and line[2] not in self.aggregates._index:
+				self.aggregates.add_user(line[2])
+			self.aggregates.add(len(self.lines) - 1, line[0].toordinal(), *line[1:])
+
+		self.get_users()
+		return len(self.lines) - start
+
+	# a single column of self.lines, without building the message tuples
+	def _column(self, index):
+		if isinstance(self.lines, MessageColumns):
+			return self.lines.column(index)
+		return [i[index] for i in self.lines]
+
+	# _column as an iterator, for a single pass that shouldn't hold the whole column
+	def _iter_column(self, index):
+		if isinstance(self.lines, MessageColumns):
+			return self.lines.iter_column(index)
+		return (i[index] for i in self.lines)
+
+	# the positions of the messages sent in [start, end), see utils.index.TimeIndex
+	def get_time_range(self, start=None, end=None):
+		return self.lines.time_index().positions(start, end)
+
+	# the dates of self.lines as day numbers
+	def _days(self):
+		if isinstance(self.lines, MessageColumns):
+			return self.lines.days
+		return [i[0].toordinal() for i in self.lines]
+
 	# get the usernames list
 	def get_users(self, first_name_only=False, anonymize=False):
 		"""
@@ -130,10 +828,13 @@ class Data(object):
 			self._users_first_name
 		while self.users will be a copy of the list requested by the flags
 		"""
+		# MessageColumns already keep every user once
 		self.users = list(
-					set(
-						[i[2] for i in self.lines]
-					)
+					self.lines.users
+					 if
+					isinstance(self.lines, MessageColumns)
+					 else
+					set(self._iter_column(2))
 				)
 
 		# set returns alphabetical order, list "shuffles" it
@@ -142,6 +843,10 @@ class Data(object):
 		if "system" in self.users:
 			self.users.remove("system")
 
+		# the counters were built for other lines
+		if self.__dict__.get("aggregates") and self.aggregates.size != len(self.lines):
+			del self.aggregates
+
 		### Anonymize ###
 		# get the length of the list, the count how many digits it has by
 		# converting it into string and counting its length
@@ -175,14 +880,34 @@ class Data(object):
 	############        MESSAGES       ############
 	###############################################
 
+	# build all the per user counters in one pass, see Aggregates
+	def aggregate(self):
+		# self._users and self.users share the same order
+		# one message at a time, the text is decoded as it's counted
+		if isinstance(self.lines, MessageColumns):
+			days = self.lines.days
+		else:
+			days = (i[0].toordinal() for i in self.lines)
+		self.aggregates = Aggregates(self._users).update(
+			zip(
+				days,
+				self._iter_column(1),
+				self._iter_column(2),
+				self._iter_column(3),
+				self._iter_column(-1)
+			)
+		)
+		return self.aggregates
+
 	# calculate amount of messages and percentage out of total messages
 	def get_user_message_metadata(self, media=False):
-		amount_of_user_messages = [
-			len([
-				i for i in self.lines if i[2] == u and i[-1] == int(media)
-			])
-			for u in self.users
-		]
+		if not self.__dict__.get("aggregates"):
+			self.aggregate()
+
+		if media:
+			amount_of_user_messages = self.aggregates.media_amount[:]
+		else:
+			amount_of_user_messages = self.aggregates.message_amount[:]
 
 		messages_amount = sum(amount_of_user_messages)
 		percent_of_messages = [float(i)/messages_amount for i in amount_of_user_messages]
@@ -197,12 +922,18 @@ class Data(object):
 		return zip(self.users, amount_of_user_messages, percent_of_messages)
 		# return [user, #messages, %messages]
 
+	# the text messages of the user at index i of self.users, decoded one by one
+	def _user_messages(self, i):
+		if isinstance(self.lines, MessageColumns):
+			return map(self.lines.message, self.aggregates.messages[i])
+		return (self.lines[j][3] for j in self.aggregates.messages[i])
+
 	# get all the messages that the user sent
 	def get_all_user_messages(self):
-		self.messages_by_user = [
-			[i[3] for i in self.lines if i[2] == u and i[-1] == 0]
-			for u in self.users
-		]
+		if not self.__dict__.get("aggregates"):
+			self.aggregate()
+
+		self.messages_by_user = [list(self._user_messages(i)) for i in range(len(self.users))]
 		self.messages_by_user_combined = list(
 			map(
 				lambda x: '\n'.join(x),
@@ -211,31 +942,191 @@ class Data(object):
 		)
 		return self.messages_by_user
 
-	def get_messages(self, message_filter):
+	def get_messages(self, message_filter, word=False):
+		"""
+		gets the message tuples whose text matches message_filter
+			a regex - str, bytes or compiled
+			a function of the message tuple
+		with word, message_filter is a single word and only messages that
+		have it as a whole WORDS_PATTERN token match
+
+		regexes and words are looked up in the text index when it was built
+		(see get_text_index), functions always run on all the messages
+		"""
 		if "__call__" in dir(message_filter):
-			filter_function = message_filter
+			return list(filter(message_filter, self.lines))
+
+		if type(message_filter) is bytes:
+			message_filter = message_filter.decode("utf8")
+
+		index = self.__dict__.get("text_index")
+		if index is not None and len(index) != len(self.lines):
+			# the lines changed since the index was built
+			index = None
+
+		if word:
+			if index is not None:
+				ids = index.word(message_filter)
+			else:
+				ids = [
+					i for i, message in enumerate(self._column(3))
+					if message_filter in Text.WORDS_PATTERN.findall(message)
+				]
 		else:
-			elif "findall" in dir(message_filter):
+			if "findall" in dir(message_filter):
 				re_pattern = message_filter
 			elif type(message_filter) is str:
 				re_pattern = re.compile(message_filter)
-			elif type(message_filter) is bytes:
-				re_pattern = re.compile(message_filter.decode("utf8"))
 			else:
 				return(bool(print("Unknown message_filter type")))
 
-			filter_function = lambda x: len(re_pattern.findall( x[3] ))
+			if index is None:
+				search = re_pattern.search
+				ids = [i for i, message in enumerate(self._column(3)) if search(message)]
+			elif not re_pattern.flags & ~re.UNICODE and utils.index.required_literal(re_pattern.pattern) == re_pattern.pattern:
+				# no special characters, a plain substring
+				ids = index.substring(re_pattern.pattern)
+			else:
+				ids = index.regex(re_pattern)
+
+		return [self.lines[i] for i in ids]
+
+	def get_text_index(self):
+		"""
+		builds (once) the utils.index.TextIndex of the messages, which
+		get_messages uses from then on
+		"""
+		index = self.__dict__.get("text_index")
+		if index is None or len(index) != len(self.lines):
+			self.text_index = utils.index.TextIndex(self._column(3), Text.WORDS_PATTERN)
+		return self.text_index
 
-		return list(filter(
-			filter_function,
-			self.lines
-		))
+	def get_following_messages(self, filter_function, amount=10, stop_after_another=True, exclude_function=None, exclude_same_user=False):
+		"""
+		gets the messages that follow every message filter_function is true for
+		returns [(message, [up to amount following messages]), ...]
+			stop_after_another - a following message that filter_function is
+			                     true for ends the window, and isn't in it
+			exclude_function   - exclude_function(message, following) true
+			                     skips that following message
+			exclude_same_user  - skips the following messages of the sender,
+			                     like exclude_function=is_same_user
+		everything is message tuples
+
+		the next filtered message of every position is found in one pass
+		(utils.index.next_true). with exclude_same_user whole runs of the
+		sender's messages are jumped over (utils.index.run_ends), so every
+		window costs O(amount) no matter how long the runs are
+		"""
+		lines = self.lines
+		filtered = [bool(filter_function(i)) for i in lines]
+		if stop_after_another:
+			window_ends = utils.index.next_true(filtered)
+
+		if exclude_same_user:
+			users = self._column(2)
+			runs = utils.index.run_ends(users)
 
-	def get_following_messages(self, filter_function, amount=10, stop_after_another=True, exclude_function=None):
 		result = []
-		for index, i in self.lines:
-			if filter_function(i):
-				pass
+		for index in range(len(filtered)):
+			if not filtered[index]:
+				continue
+
+			message = lines[index]
+			end = window_ends[index] if stop_after_another else len(filtered)
+			following = []
+			i = index + 1
+			while i < end and len(following) < amount:
+				if exclude_same_user and users[i] == users[index]:
+					i = runs[i]
+					continue
+				if exclude_function and exclude_function(message, lines[i]):
+					i += 1
+					continue
+				following.append(lines[i])
+				i += 1
+
+			result.append((message, following))
+		return result
+
+	###############################################
+	############         FRAMES        ############
+	###############################################
+
+	def _frame_columns(self):
+		"""
+		the columns of to_frame / to_arrow as numpy arrays, computed from the
+		arrays of self.lines in whole-array operations
+		"""
+		import numpy as np
+
+		lines = self.lines
+		days = np.asarray(lines.days, np.int64) - utils.date.EPOCH_DAY
+		minutes = np.asarray(lines.minutes, np.int64)
+		dates = days.astype("datetime64[D]")
+		return {
+			"timestamp" : (days * 24 * 60 + minutes).astype("datetime64[m]").astype("datetime64[s]"),
+			# copies, the arrays of self.lines can't grow while something views them
+			"user_ids"  : np.array(lines.user_ids, np.int32),
+			"types"     : np.array(lines.types, np.int8),
+			"year"      : (dates.astype("datetime64[Y]").astype(np.int64) + 1970).astype(np.int16),
+			"month"     : (dates.astype("datetime64[M]").astype(np.int64) % 12 + 1).astype(np.int8),
+			# Mon=0, ordinal 1 is a Monday
+			"weekday"   : ((days + utils.date.EPOCH_DAY - 1) % 7).astype(np.int8),
+			"hour"      : (minutes // 60).astype(np.int8),
+		}
+
+	def to_frame(self, messages=True):
+		"""
+		self.lines as a pandas.DataFrame, a row per message
+			timestamp - datetime64
+			user      - categorical of self.lines.users ("system" included)
+			message   - str, left out without messages
+			type      - categorical of MESSAGE_TYPE
+			year, month, weekday (Mon=0), hour
+		pandas is only imported here
+		"""
+		import pandas as pd
+
+		columns = self._frame_columns()
+		frame = {
+			"timestamp" : columns["timestamp"],
+			"user"      : pd.Categorical.from_codes(columns["user_ids"], self.lines.users),
+		}
+		if messages:
+			frame["message"] = self._column(3)
+		frame["type"] = pd.Categorical.from_codes(columns["types"], [MESSAGE_TYPE[i] for i in sorted(MESSAGE_TYPE)])
+		for name in ("year", "month", "weekday", "hour"):
+			frame[name] = columns[name]
+		return pd.DataFrame(frame)
+
+	def to_arrow(self, messages=True):
+		"""
+		self.lines as a pyarrow.Table, with the columns of to_frame.
+		user and type are dictionary arrays, and the messages of a MessageTable
+		are handed to arrow as its text buffer and offsets, without creating a
+		str per message. pyarrow is only imported here
+		"""
+		import pyarrow as pa
+
+		columns = self._frame_columns()
+		table = {
+			"timestamp" : pa.array(columns["timestamp"]),
+			"user"      : pa.DictionaryArray.from_arrays(columns["user_ids"], self.lines.users),
+		}
+		if messages:
+			if isinstance(self.lines, MessageTable):
+				table["message"] = pa.LargeStringArray.from_buffers(
+					len(self.lines),
+					pa.py_buffer(bytes(self.lines.offsets)),
+					pa.py_buffer(bytes(self.lines.text))
+				)
+			else:
+				table["message"] = pa.array(self._column(3), pa.large_string())
+		table["type"] = pa.DictionaryArray.from_arrays(columns["types"], [MESSAGE_TYPE[i] for i in sorted(MESSAGE_TYPE)])
+		for name in ("year", "month", "weekday", "hour"):
+			table[name] = pa.array(columns[name])
+		return pa.table(table)
 
 	###############################################
 	############         WORDS         ############
@@ -243,42 +1134,53 @@ class Data(object):
 
 	# get Words Per Message
 	def get_user_wpm(self, ignore_short_messages=0):
-		if not self.__dict__.get("messages_by_user"):
-			get_all_user_messages(self.lines, self.users)
+		if not self.__dict__.get("aggregates"):
+			self.aggregate()
+
+		if not ignore_short_messages:
+			self.user_wpm = [
+				float(self.aggregates.word_amount[i])
+				 /
+				self.aggregates.message_amount[i]
+				for i in range(len(self.users))
+			]
+			return self.user_wpm
+
 		self.user_wpm = [
 			# join all the user messages, and then split by whitespace
 			float( # get accurate division
 				sum( # combine all the messages
 					filter( # filter out messages shorter than wanted
-						(lambda x: x > ignore_short_messages)
-						 if
-						ignore_short_messages
-						 else
-						None,
+						lambda x: x > ignore_short_messages,
 						map( # run on all the messages
 							# change from message to amount of words in the message
 							lambda x: len(x.split()),
-							self.messages_by_user[i]
+							self._user_messages(i)
 						)
 					)
 				)
 			)
 			 /
-			len(self.messages_by_user[i])
+			self.aggregates.message_amount[i]
 			for i in range(len(self.users))
 		]
 		return self.user_wpm
 
 	# get H Per Message
 	def get_user_hpm(self):
-		if not self.__dict__.get("messages_by_user_combined"):
-			get_all_user_messages()
-				# H Per Message
+		if not self.__dict__.get("aggregates"):
+			self.aggregate()
 
-		all_user_h = list(map(Text.H_PATTERN.findall, self.messages_by_user_combined))
-		
-		user_h_messages = list(map(len, all_user_h))
-		self.user_h_amount = [len(''.join(h)) for h in all_user_h]
+		# the H runs are counted by their lengths (see scan_laughter), the runs
+		# themselves are only rebuilt here for the return value, shortest first
+		self.user_h_run_lengths = self.aggregates.h_run_lengths
+		all_user_h = [
+			[Text.H * n for n in sorted(lengths.elements())]
+			for lengths in self.user_h_run_lengths
+		]
+
+		user_h_messages = self.aggregates.h_run_amount[:]
+		self.user_h_amount = self.aggregates.h_amount[:]
 
 		# H per message
 		self.user_hpm = list( # convert map to list
@@ -286,7 +1188,7 @@ class Data(object):
 				lambda x: float(x[0]) / x[1],
 				zip(
 					self.user_h_amount,
-					self.user_message_amount
+					self.aggregates.message_amount
 				)
 			)
 		)
@@ -295,25 +1197,80 @@ class Data(object):
 		self.user_hpd = [
 			float(self.user_h_amount[i])
 			 /
-			len(self.messages_by_user_combined[i].replace(' ', ''))
+			self.aggregates.length[i]
 			for i in range(len(self.users))
 		]
 		return all_user_h, user_h_messages, self.user_h_amount, self.user_hpm, self.user_hpd
 
+	def get_document_terms(self, by="user"):
+		"""
+		the utils.terms.DocumentTermMatrix of the words (WORDS_PATTERN) in the
+		text messages, built once for every by
+			message - a row per message of self.lines, media and system
+			          messages are empty rows
+			user    - a row per user, the rows are self._users. built out of
+			          the counters of self.aggregates, without tokenizing again
+			day     - a row per day with messages, the rows are day numbers
+		"""
+		if by not in ("message", "user", "day"):
+			raise Exception("Unknown document %s" % by)
+
+		terms = self.__dict__.setdefault("document_terms", {})
+		if by in terms and terms[by][0] == len(self.lines):
+			return terms[by][1]
+
+		if by == "user":
+			if not self.__dict__.get("aggregates"):
+				self.aggregate()
+			matrix = utils.terms.DocumentTermMatrix.from_counters(self.aggregates.words, self.aggregates.users)
+		else:
+			texts = (m if t == 0 else "" for m, t in zip(self._column(3), self._column(-1)))
+			if by == "message":
+				matrix = utils.terms.DocumentTermMatrix(texts, Text.WORDS_PATTERN)
+			else:
+				matrix = utils.terms.DocumentTermMatrix(texts, Text.WORDS_PATTERN, self._days())
+
+		terms[by] = (len(self.lines), matrix)
+		return matrix
+
 	# create a list of all the words
 	def get_all_words(self):
-		self.words = sum([ Text.WORDS_PATTERN.findall(i[3]) for i in self.lines if i[-1] == 0 ], [])
+		# get_document_terms doesn't need this list, it is only built for
+		# callers that want the words themselves
+		self.words = []
+		for message, message_type in zip(self._column(3), self._column(-1)):
+			if message_type == 0:
+				self.words += Text.WORDS_PATTERN.findall(message)
 		return self.words
 
-	def get_most_common_words(self, amount=10, display=False):
-		self.words_histogram = Counter(self.words)
-
-		words = list(zip(self.words_histogram.keys(), self.words_histogram.values()))
+	def get_sketch(self, **kwargs):
+		"""
+		the utils.sketch.WordSketch of the users and of the words in the text
+		messages, built once (kwargs go to WordSketch). fixed memory, unlike
+		get_document_terms, at the cost of approximate counts
+		"""
+		sketch = self.__dict__.get("sketch")
+		if sketch is None or sketch[0] != (len(self.lines), kwargs):
+			words = Text.WORDS_PATTERN.findall
+			sketch = utils.sketch.WordSketch(**kwargs).update(
+				(user, words(message) if message_type == 0 else ())
+				for user, message, message_type in zip(self._column(2), self._column(3), self._column(-1))
+				if message_type != 2
+			)
+			self.sketch = ((len(self.lines), kwargs), sketch)
+		return self.sketch[1]
 
-		words.sort(key=lambda x: x[1])
+	def get_most_common_words(self, amount=10, display=False, user=None, approximate=False):
+		# with approximate the counts come from get_sketch, which has no per user counts
+		if approximate:
+			if user is not None:
+				raise Exception("The sketch has no per user counts")
+			words = self.get_sketch().most_common(amount)
+		else:
+			terms = self.get_document_terms()
+			self.words_histogram = self.aggregates.words_histogram
 
-		if amount:
-			words = words[-amount:]
+			words = terms.top(amount, None if user is None else terms.row(user))
 
 		if display:
 			print('\n'.join(["%04d - %s" % (i[1], i[0][::-1]) for i in words]))
@@ -324,8 +1281,27 @@ class Data(object):
 	############         EMOJIS        ############
 	###############################################
 
-	def get_non_letters(data):
-		words = '\n'.join(data.messages_by_user_combined)
+	def get_emojis(self, amount=10):
+		"""
+		counts the emojis (utils.emoji) in the messages of every user in one
+		pass over their text
+			self.user_emojis       - Counter of emoji codes per user
+			self.emojis_histogram  - Counter of emoji codes of all the users
+		returns the amount most common (code, count), least common first
+		"""
+		if not self.__dict__.get("aggregates"):
+			self.aggregate()
+
+		matcher = utils.emoji.get_matcher()
+		self.user_emojis = [matcher.count(self._user_messages(i)) for i in range(len(self.users))]
+		self.emojis_histogram = Counter()
+		for i in self.user_emojis:
+			self.emojis_histogram.update(i)
+
+		return heapq.nlargest(amount, self.emojis_histogram.items(), key=itemgetter(1))[::-1]
+
+	def get_non_letters(self):
+		words = '\n'.join(self.messages_by_user_combined)
 		words = re.sub(Text.WORDS_PATTERN, '', words)
 		words = re.sub(Text.PUNCTUATIONS_PATTERN, '', words)
 		words = re.sub(Text.NUMBER_PATTERN, '', words)
@@ -336,38 +1312,34 @@ class Data(object):
 ############        EXAMPLES       ############
 ###############################################
 
+def is_same_user(x, y):
+	return x[2] == y[2]
+
 def plot_words(words, amount=15):
 	utils.plot.hist(words, sort=lambda x: x[1], amount=amount, map=lambda x: [x[0].decode("utf8")[::-1], x[1]])
 
+def plot_emojis(data, amount=15):
+	emojis = data.get_emojis(amount)
+	utils.plot.emoji_bar([i[1] for i in emojis], [i[0] for i in emojis])
+
 def whos_the_funniest(data):
 	def is_media(x):
 		return x[-1] == 1
-	def is_same_user(x,y):
-		return x[2] == y[2]
 
 	# get all the media messages
-	all_media = data.get_following_messages(is_media, exclude_function=is_same_user)
-
-	# reformat for our needs (the media message, all the following messages combined)
-	all_media_formatter = [
-		(
-			i[0],
-			'\n'.join([j[3] for j in i[1]])
-		)
-		for i in all_media
-	]
+	all_media = data.get_following_messages(is_media, exclude_same_user=True)
 
+	# the media message and the amount of H in all the following messages,
+	# counted message by message instead of on the messages combined
 	media_h_amount = [
 		(
 			i[0],
 			sum( # get the total amount of H
-				map( # count amount per result of findall
-					len, # count amount of H
-					Text.H_PATTERN.findall(i[1]) # get H out of all the messages
-				)
+				sum(scan_laughter(j[3])[0]) # amount of H in a message
+				for j in i[1]
 			)
 		)
-		for i in all_media_formatter
+		for i in all_media
 	]
 
 	user_h_per_media = [
@@ -398,14 +1370,35 @@ def whos_the_funniest(data):
 
 	utils.plot.bar(user_h_per_media, data._users_first_name)
 
+###############################################
+############        LOADING        ############
+###############################################
+
+# loaded Data by file name, see load
+_loaded = {}
+
+def load(file_name='w', cache=True):
+	"""
+	parses the export and runs Data.init_all, only once per file name.
+	importing this module doesn't parse anything, call this (or use the
+	module attribute "d", which calls load()) when the data is needed
+	"""
+	if file_name not in _loaded:
+		start = time.time()
+		d = Data(file_name, cache=cache)
+		d.init_all()
+		print("[*] loaded in %s seconds" % (time.time() - start))
+		_loaded[file_name] = d
+	return _loaded[file_name]
+
+def __getattr__(name):
+	# "d" used to be created as an import side effect, now it's created on first use
+	if name == 'd':
+		return load()
+	raise AttributeError("module %r has no attribute %r" % (__name__, name))
+
 if __name__ == '__main__':
-	pass
-else:
-	start = time.time()
-	d = Data()
-	d.init_all()
-	print("[*] loaded in %s seconds" % (time.time() - start))
-	del start
+	load()
 	# data = read_data()
 	# lines = parse_lines(data)
 	# users = get_users(lines)
@@ -1,12 +1,21 @@
-import re
-from dateutil.parser import parse as dateutil_parse_date
+import os
+import utils.date
+import utils.index
+import whatsapp_parser
+import numpy as np
 import matplotlib.pyplot as plt
 from datetime import datetime
 
 DAYS = ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun']
 MONTHS = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
 
-SUPPORTED_HOURS_DELTA = [0.5, 1, 2]
+# day number (datetime.toordinal) of numpy's datetime64 epoch
+EPOCH_DAY = utils.date.EPOCH_DAY
+
+# {file_name: ((size, mtime), TimeIndex)} of the files read by get_time_index
+_time_indexes = {}
+# (list, its length, TimeIndex) of the last list given to get_filtered_dates
+_list_index = (None, 0, None)
 
 def read_data(file_name='w'):
 	f = open(file_name, 'rb')
@@ -27,84 +36,70 @@ def parse_lines(data):
 
 ###### TIME PARSING ######
 def get_full_dates(data=None):
-	if not data:
-		data = read_data()
+	# the "[date], [time]" of every message, see whatsapp_parser.split_messages
+	if data is None:
+		data = read_data().decode("utf8")
 
-	return re.findall(u"\d{1,2}/\d{1,2}/\d\d, \d\d:\d\d - ", data)
+	return [i[0] for i in whatsapp_parser.split_messages(data)]
 
 #### DATES ####
 def get_dates(data=None):
-	if not data:
+	if data is None:
 		data = get_full_dates()
-	raw = [re.findall("^(\d{1,2}/\d{1,2}/\d\d), ", i)[0] for i in data]
-	# dates in datetime format
-	return [dateutil_parse_date(i) for i in raw]
+	# dates in datetime format, the order is detected from every date like Data does
+	dayfirst = whatsapp_parser.detect_dayfirst(data)
+	return [utils.date.day_to_date(utils.date.parse_day(i[:i.find(",")], dayfirst)) for i in data]
 
 def get_filtered_dates(data=None, start=None, end=None):
-	if not data:
-		data = get_dates()
-
-	if start and end:
-		return [i for i in data if start <= i < end]
-	elif start and not end:
-		return [i for i in data if start <= i      ]
-	elif not start and end:
-		return [i for i in data if          i < end]
-	else:
-		return [i for i in data if          i      ]
+	"""
+	the dates of data between start (inclusive) and end (exclusive), in time
+	order. data is None (the file), a list of datetimes or anything with a
+	time_index(), and the range is found in a TimeIndex (see get_time_index)
+	"""
+	if data is None or hasattr(data, "time_index"):
+		# whole dates, like the midnights of get_dates
+		index = get_time_index(data)
+		return [utils.date.day_to_date(i) for i in index.select(index.days, _midnight(start), _midnight(end))]
+
+	index = _list_time_index(data)
+	if index.order is None:
+		return data[slice(*index.bounds(start, end))]
+	return [data[i] for i in index.positions(start, end)]
 
 def get_weekdays(data=None, start=None, end=None):
-	data = get_filtered_dates(data, start, end)
-
-	weekdays = [0]*7
-	for i in data:
-		weekdays[i.weekday()] += 1
-	
-	return weekdays
+	days = _filtered_days(data, start, end)
+	return get_histograms(days)["weekdays"].tolist()
 
 def get_months(data=None, start=None, end=None):
-	data = get_filtered_dates(data, start, end)
-
-	months = [0]*12
-	for i in data:
-		months[i.month - 1] += 1
-
-	return months
+	days = _filtered_days(data, start, end)
+	return get_histograms(days)["months"].tolist()
 
 def get_creation_date(data=None):
-	if not data:
+	if data is None:
 		data = get_dates()
 
 	return data[0]
 
 def get_last_date(data=None):
-	if not data:
+	if data is None:
 		data = get_dates()
 
 	return data[-1]
 
 #### hours ####
 def get_raw_minutes(data=None):
-	if not data:
+	if data is None:
 		data = get_full_dates()
-	raw = [re.findall(", (\d\d:\d\d) - ", i)[0] for i in data]
 	# convert hh:mm to minutes (02:15 -> 135)
-	return [int(i[:2]) * 60 + int(i[-2:]) for i in raw]
+	return [utils.date.parse_minutes(i[i.find(", ") + 2:]) for i in data]
 
 def get_minutes(data=None, delta=0.5):
-	if not data:
+	if data is None:
 		data = get_raw_minutes()
-	if delta not in SUPPORTED_HOURS_DELTA:
-		raise Exception("Unsupported hour delta")
-	
-	# create a list of 48 counters for each half an hour
-	minutes_groups = [0] * int(24. / delta)
-	# iterate all the messages and add every message to its 
-	for i in data:
-		minutes_groups[i / int(60 * delta)] += 1
 
-	return minutes_groups
-	
+	# a counter for every delta hours (48 counters for half an hour)
+	return get_histograms(minutes=data, delta=delta)["minutes"].tolist()
+
 def parse_time(data):
 	# collects the date + hour for every message (including system messages and media)
 	full_dates = get_full_dates(data)
@@ -112,11 +107,10 @@ def parse_time(data):
 	######### dates #########
 	dates_dt = get_dates(full_dates)
 
-	weekdays = [0]*7
-	months = [0]*12
-	for i in dates_dt:
-		weekdays[i.weekday() - 1] += 1
-		months[i.month - 1] += 1
+	histograms = get_histograms(_days(dates_dt))
+	# Tue-Mon, one day off the DAYS order
+	weekdays = np.roll(histograms["weekdays"], -1).tolist()
+	months = histograms["months"].tolist()
 
 	######### hours #########
 	minutes = get_raw_minutes(full_dates)
@@ -136,6 +130,128 @@ def parse_time(data):
 
 	return weekdays, months, hours
 
+###### HISTOGRAMS ######
+def get_days_and_minutes(data=None):
+	"""
+	the dates of get_full_dates as numpy arrays
+		day numbers (datetime.toordinal)
+		minutes since midnight
+	"""
+	if data is None:
+		data = get_full_dates()
+
+	dayfirst = whatsapp_parser.detect_dayfirst(data)
+	days = np.fromiter(
+		(utils.date.parse_day(i[:i.find(',')], dayfirst) for i in data),
+		np.int32,
+		len(data)
+	)
+	minutes = np.fromiter(
+		(utils.date.parse_minutes(i[i.find(", ") + 2:]) for i in data),
+		np.int16,
+		len(data)
+	)
+	return days, minutes
+
+def get_time_index(data=None, file_name='w'):
+	"""
+	utils.index.TimeIndex of data - None (the file, which is only read again
+	once it changes), or anything with a time_index() such as
+	whatsapp_parser.MessageTable
+	"""
+	if data is not None:
+		return data.time_index()
+
+	st = os.stat(file_name)
+	signature = (st.st_size, st.st_mtime_ns)
+	if _time_indexes.get(file_name, (None,))[0] != signature:
+		days, minutes = get_days_and_minutes(get_full_dates(read_data(file_name).decode("utf8")))
+		_time_indexes[file_name] = (signature, utils.index.TimeIndex(days, minutes))
+	return _time_indexes[file_name][1]
+
+def _list_time_index(data):
+	"""
+	TimeIndex of a list of datetimes, kept for the last list it was built for
+	so a list is only sorted / checked once while its length stays the same
+	"""
+	global _list_index
+	if _list_index[0] is not data or _list_index[1] != len(data):
+		index = utils.index.TimeIndex(
+			[i.toordinal() for i in data],
+			[getattr(i, "hour", 0) * 60 + getattr(i, "minute", 0) for i in data]
+		)
+		_list_index = (data, len(data), index)
+	return _list_index[2]
+
+def _days(data=None):
+	# day numbers of data - None (read the file), a list of datetimes, or
+	# anything with a "days" array such as whatsapp_parser.MessageTable
+	if data is None:
+		return get_time_index().days
+	if hasattr(data, "days"):
+		return np.asarray(data.days, np.int32)
+	return np.fromiter((i.toordinal() for i in data), np.int32, len(data))
+
+def _filtered_days(data=None, start=None, end=None):
+	# the days of data between start (inclusive) and end (exclusive)
+	if data is None or hasattr(data, "time_index"):
+		# compare whole dates, like get_filtered_dates
+		index = get_time_index(data)
+		return np.asarray(index.select(index.days, _midnight(start), _midnight(end)), np.int32)
+
+	return _days(get_filtered_dates(data, start, end))
+
+def _midnight(date):
+	# the first midnight that is not before date, a datetime or a date
+	if date:
+		partial = isinstance(date, datetime) and date != datetime.fromordinal(date.toordinal())
+		return datetime.fromordinal(date.toordinal() + partial)
+
+def get_histograms(days=None, minutes=None, users=None, delta=0.5, users_amount=None):
+	"""
+	all the time histograms of the messages in one vectorized call
+		days    - day numbers (datetime.toordinal) of the messages
+		minutes - minutes since midnight of the messages
+		users   - user index of every message, for the per user histograms
+		delta   - hours per bucket of the "minutes" histogram, any width
+
+	returns a dict of numpy arrays, each only if its input was given
+		weekdays - 7 counters, Mon-Sun
+		months   - 12 counters, Jan-Dec
+		hours    - 24 counters
+		minutes  - a counter for every delta hours
+	with users every histogram has one row per user, and the totals are in
+	"weekdays", "months", ... while the rows are in "user_weekdays", ...
+	"""
+	buckets = {}
+	if days is not None:
+		days = np.asarray(days, np.int64)
+		# ordinal 1 is a Monday
+		buckets["weekdays"] = ((days - 1) % 7, 7)
+		months = (days - EPOCH_DAY).astype("datetime64[D]").astype("datetime64[M]")
+		buckets["months"] = (months.astype(np.int64) % 12, 12)
+	if minutes is not None:
+		minutes = np.asarray(minutes, np.int64)
+		width = int(round(60 * delta))
+		if width <= 0:
+			raise Exception("Unsupported hour delta")
+		buckets["hours"] = (minutes // 60, 24)
+		buckets["minutes"] = (minutes // width, -(-24 * 60 // width))
+
+	histograms = {}
+	for name, (index, length) in buckets.items():
+		if users is None:
+			histograms[name] = np.bincount(index, minlength=length)
+			continue
+
+		users = np.asarray(users, np.int64)
+		amount = users_amount or (int(users.max()) + 1 if len(users) else 0)
+		per_user = np.bincount(users * length + index, minlength=amount * length)
+		histograms["user_" + name] = per_user.reshape(amount, length)
+		histograms[name] = histograms["user_" + name].sum(axis=0)
+
+	return histograms
+
 ###### PLOTTING ######
 def plot_weekdays(data=None, width=1/1.5, start=None, end=None):
 	data = get_weekdays(data, start, end)
@@ -152,25 +268,16 @@ def plot_months(data=None, width=1/1.5, start=None, end=None):
 	plt.show()
 
 def plot_hours(data=None, width=1/1.5, delta=0.5):
-	if not data:
+	if data is None:
 		data = get_minutes(delta=delta)
-	if delta not in SUPPORTED_HOURS_DELTA:
-		raise Exception("Unsupported hour delta")
-	
+
 	plt.bar(range(len(data)), data, width, color="blue")
-	
-	if delta == 0.5:
-		minutes_groups_titles = [
-			"%02d" % (i / 2)
-			 +
-			(":30" if i % 2 else ":00")
-			for i in range(48)
-		]
-	elif type(delta) is int:
-		minutes_groups_titles = [
-			"%02d:00" % (i * delta)
-			for i in range(24 / delta)
-		]
+
+	# create the title for every bucket (e.g. "10:30")
+	minutes_groups_titles = [
+		"%02d:%02d" % divmod(int(round(i * 60 * delta)), 60)
+		for i in range(len(data))
+	]
 	plt.xticks(range(len(data)), minutes_groups_titles)
 	plt.show()
 